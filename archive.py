@@ -0,0 +1,246 @@
+import argparse
+import gzip
+import json
+import lzma
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from timeindex import iter_records, open_index
+
+# The server's journal owns the session lock
+sys.path.append(str(Path(__file__).resolve().parent / "server"))
+from journal import is_running
+
+FORMAT = "mcws-archive"
+VERSION = 1
+OPENERS = {".xz": lzma.open, ".gz": gzip.open}
+SUFFIXES = {"lzma": ".archive.xz", "gzip": ".archive.gz"}
+
+ArchiveHeader = namedtuple("ArchiveHeader", ["source", "records", "first", "last"])
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Archive layout (one JSON array per line, inside gzip or xz framing):
+#   header line:  {"format": ..., "version": ..., "source": ..., "records": ..., "first": ..., "last": ...}
+#   ["S", id, [path, ...]]             new schema: the leaf paths of a record shape, in key order
+#   ["V", value]                       new dictionary entry (gets the next index)
+#   ["R", schema id, dt, v1, v2, ...]  record: dt = microseconds since the previous timestamp (or null),
+#                                      floats are stored as-is, every other value is a dictionary index
+
+
+def _flatten(value, path, out):
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            _flatten(item, path + (key,), out)
+    else:
+        out.append((path, value))
+    return out
+
+
+def _unflatten(paths, values):
+    record = {}
+    for path, value in zip(paths, values):
+        target = record
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return record
+
+
+def _micros(value):
+    """Naive timestamp -> integer microseconds, exact and unaffected by time zones."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - EPOCH) // MICROSECOND
+
+
+def _value_key(value):
+    # Keep True/1 and lists/dicts apart when used as dictionary keys
+    if isinstance(value, (list, dict)):
+        return ("json", json.dumps(value))
+    return (type(value).__name__, value)
+
+
+class ArchiveWriter:
+    """Schema-aware encoder: record shapes and repeated values are written once, then referenced."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.schemas = {}
+        self.values = {}
+        self.last_time = None
+
+    def _line(self, item):
+        self.stream.write(json.dumps(item, separators=(",", ":")) + "\n")
+
+    def write(self, record):
+        delta = None
+        leaves = _flatten(record, (), [])
+        timestamp = record.get("timestamp") if isinstance(record, dict) else None
+        if isinstance(timestamp, str):
+            try:
+                moment = datetime.fromisoformat(timestamp)
+            except ValueError:
+                moment = None
+            # Only delta-encode timestamps that round-trip exactly
+            if moment is not None and moment.isoformat() == timestamp and moment.tzinfo is None:
+                micros = _micros(moment)
+                delta = micros - (self.last_time if self.last_time is not None else 0)
+                self.last_time = micros
+
+        paths = tuple(path for path, _ in leaves)
+        schema_id = self.schemas.get(paths)
+        if schema_id is None:
+            schema_id = self.schemas[paths] = len(self.schemas)
+            self._line(["S", schema_id, [list(path) for path in paths]])
+
+        encoded = []
+        for path, value in leaves:
+            if delta is not None and path == ("timestamp",):
+                continue
+            if isinstance(value, float):
+                encoded.append(value)
+                continue
+            key = _value_key(value)
+            index = self.values.get(key)
+            if index is None:
+                index = self.values[key] = len(self.values)
+                self._line(["V", value])
+            encoded.append(index)
+        self._line(["R", schema_id, delta] + encoded)
+
+
+def _timestamp_position(paths):
+    return paths.index(("timestamp",)) if ("timestamp",) in paths else None
+
+
+def iter_archive(path, start=None, end=None):
+    """Stream events out of an archive without decompressing the whole file into memory."""
+    path = Path(path)
+    start_us = None if start is None else _micros(start)
+    end_us = None if end is None else _micros(end)
+    schemas = []
+    values = []
+    last_time = 0
+
+    with OPENERS[path.suffix](path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not an event archive")
+
+        for line in f:
+            item = json.loads(line)
+            kind = item[0]
+            if kind == "V":
+                values.append(item[1])
+            elif kind == "S":
+                paths = [tuple(p) for p in item[2]]
+                schemas.append((paths, _timestamp_position(paths)))
+            else:
+                paths, ts_pos = schemas[item[1]]
+                delta = item[2]
+                decoded = [v if isinstance(v, float) else values[v] for v in item[3:]]
+                # Containers come from the shared dictionary; give each record its own copy
+                decoded = [json.loads(json.dumps(v)) if isinstance(v, (list, dict)) else v for v in decoded]
+                if delta is not None:
+                    last_time += delta
+                    if (start_us is not None and last_time < start_us) or (end_us is not None and last_time > end_us):
+                        continue
+                    decoded.insert(ts_pos, (EPOCH + last_time * MICROSECOND).isoformat())
+                elif start_us is not None or end_us is not None:
+                    continue  # No usable timestamp to filter on
+                yield _unflatten(paths, decoded)
+
+
+def read_header(path):
+    """Archive metadata from the first line only."""
+    path = Path(path)
+    with OPENERS[path.suffix](path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    return ArchiveHeader(header.get("source"), header.get("records"), header.get("first"), header.get("last"))
+
+
+def archive_file(data_path, method="lzma", out_path=None):
+    """Convert one JSON event file to an archive. Returns a stats dict."""
+    data_path = Path(data_path)
+    out_path = Path(out_path) if out_path else data_path.with_name(data_path.stem + SUFFIXES[method])
+    opener = lzma.open if method == "lzma" else gzip.open
+    index = open_index(data_path, save=False)
+
+    started = time.perf_counter()
+    records = 0
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with opener(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION, "source": data_path.name,
+                            "records": index.records, "first": index.first, "last": index.last}) + "\n")
+        writer = ArchiveWriter(f)
+        for _, _, record in iter_records(data_path):
+            writer.write(record)
+            records += 1
+    tmp.replace(out_path)
+    encode_seconds = time.perf_counter() - started
+
+    # Decode it back to verify and measure read throughput
+    started = time.perf_counter()
+    decoded = sum(1 for _ in iter_archive(out_path))
+    decode_seconds = time.perf_counter() - started
+    if decoded != records:
+        raise ValueError(f"{out_path}: decoded {decoded} of {records} records")
+
+    input_bytes = data_path.stat().st_size
+    output_bytes = out_path.stat().st_size
+    return {
+        "archive": out_path,
+        "records": records,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "ratio": input_bytes / max(output_bytes, 1),
+        "encode_seconds": encode_seconds,
+        "decode_seconds": decode_seconds,
+        "decode_records_per_second": records / max(decode_seconds, 1e-9),
+        "decode_mb_per_second": input_bytes / 1e6 / max(decode_seconds, 1e-9)
+    }
+
+
+def is_finished(data_path, min_age):
+    """A session is finished once no server has it open, nothing is left in its journal, and neither
+    the data file nor the journal has changed for min_age seconds."""
+    data_path = Path(data_path)
+    if is_running(data_path):
+        return False
+    journal = data_path.with_suffix(".journal")
+    paths = [data_path]
+    if journal.exists():
+        with journal.open("rb") as f:
+            f.readline()
+            if f.readline():
+                return False  # Events not yet checkpointed (needs recovery)
+        paths.append(journal)
+    return all(time.time() - path.stat().st_mtime >= min_age for path in paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress finished event sessions into schema-aware archives.")
+    parser.add_argument("files", nargs="+", help="events_*.json files to archive")
+    parser.add_argument("--method", choices=sorted(SUFFIXES), default="lzma", help="compression framing")
+    parser.add_argument("--min-age", type=float, default=60, help="minutes since last write before archiving")
+    parser.add_argument("--remove", action="store_true", help="delete the JSON file after a verified archive")
+    args = parser.parse_args()
+
+    for file in args.files:
+        path = Path(file)
+        if not is_finished(path, args.min_age * 60):
+            print(f"{path.name}: skipped (session open in a running server, recently written, or journal not recovered)")
+            continue
+        stats = archive_file(path, args.method)
+        print(f"{path.name} -> {stats['archive'].name}: {stats['records']} events, "
+              f"{stats['input_bytes'] / 1e6:.2f} MB -> {stats['output_bytes'] / 1e6:.2f} MB "
+              f"(ratio {stats['ratio']:.1f}x), decode {stats['decode_records_per_second']:.0f} events/s "
+              f"({stats['decode_mb_per_second']:.1f} MB/s)")
+        if args.remove:
+            path.unlink()
+            for sidecar in (path.with_suffix(".idx"), path.with_suffix(".journal"), path.with_suffix(".lock")):
+                sidecar.unlink(missing_ok=True)
@@ -9,6 +9,10 @@ from collections import defaultdict, Counter
 import math
 from openai import AzureOpenAI
 from matplotlib.backends.backend_pdf import PdfPages  # Import for PDF export
+from timeindex import WINDOW_PRESETS, open_index, load_events, resolve_window
+from sqlite_store import EventStore
+from archive import OPENERS, iter_archive, read_header
+from profiling import RunProfiler
 
 class PlayerAssessmentApp:
     def __init__(self, root):
@@ -33,19 +37,53 @@ class PlayerAssessmentApp:
             "positions": []  # list of positions
         })
         self.selected_file = None
+        self.time_index = None
+        self.store = None  # set when a SQLite database is loaded instead of a JSON file
+        self.window = (None, None)
         self.selected_player = tk.StringVar()
 
         # UI setup
+        self.status_bar = ttk.Label(root, text="", relief=tk.SUNKEN, anchor="w")
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)  # Packed first so the expanding output never hides it
+        self.profiler = RunProfiler("assessment", report=lambda summary: self.status_bar.config(text=summary))
+        self.add_profiling_menu()
+
         self.file_label = ttk.Label(root, text="No file selected")
         self.file_label.pack(pady=5)
 
         self.select_button = ttk.Button(root, text="Load Log File", command=self.load_file)
         self.select_button.pack(pady=5)
 
+        # Session picker for SQLite databases
+        self.session = tk.StringVar()
+        self.session_dropdown = ttk.Combobox(root, textvariable=self.session, state="disabled", width=40)
+        self.session_dropdown.pack(pady=5)
+        self.session_dropdown.bind("<<ComboboxSelected>>", self.apply_window)
+
         self.player_dropdown = ttk.Combobox(root, textvariable=self.selected_player, state="readonly")
         self.player_dropdown.pack(pady=5)
         self.player_dropdown.bind("<<ComboboxSelected>>", self.run_analysis)
 
+        # Time window selector (only the matching slice of the file is loaded)
+        window_frame = ttk.Frame(root)
+        window_frame.pack(pady=5)
+        self.window_preset = tk.StringVar(value="Whole session")
+        ttk.Label(window_frame, text="Time window:").pack(side=tk.LEFT)
+        self.window_dropdown = ttk.Combobox(window_frame, textvariable=self.window_preset,
+                                            values=list(WINDOW_PRESETS), state="readonly", width=16)
+        self.window_dropdown.pack(side=tk.LEFT, padx=5)
+        self.window_dropdown.bind("<<ComboboxSelected>>", self.apply_window)
+        ttk.Label(window_frame, text="From").pack(side=tk.LEFT)
+        self.window_from = ttk.Entry(window_frame, width=10)
+        self.window_from.pack(side=tk.LEFT, padx=5)
+        self.window_from.bind("<Return>", self.apply_window)
+        ttk.Label(window_frame, text="To").pack(side=tk.LEFT)
+        self.window_to = ttk.Entry(window_frame, width=10)
+        self.window_to.pack(side=tk.LEFT, padx=5)
+        self.window_to.bind("<Return>", self.apply_window)
+        self.window_label = ttk.Label(root, text="")
+        self.window_label.pack()
+
         # Button frame for horizontal alignment
         button_frame = ttk.Frame(root)
         button_frame.pack(pady=10)
@@ -98,33 +136,107 @@ class PlayerAssessmentApp:
     def load_file(self):
         file_path = filedialog.askopenfilename(
             title="Select Minecraft Log File",
-            filetypes=[("JSON files", "*.json")]
+            filetypes=[("Event files", "*.json *.db *.xz *.gz"), ("JSON files", "*.json"),
+                       ("SQLite databases", "*.db"), ("Archives", "*.xz *.gz")]
         )
         if file_path:
             self.selected_file = Path(file_path)
             self.file_label.config(text=f"Loaded: {self.selected_file.name}")
             self.analyze_button.config(state="normal")
+            self.load_store()
             self.load_events()
 
-    def load_events(self):
-        try:
-            with open(self.selected_file, "r") as f:
-                self.events = json.load(f)
-        except Exception as e:
-            self.file_label.config(text=f"Error reading file: {e}")
+    def load_store(self):
+        """Open the SQLite database and list its sessions, or clear the store for JSON files."""
+        if self.store is not None:
+            self.store.conn.close()
+            self.store = None
+        if self.selected_file.suffix != ".db":
+            self.session_dropdown.config(values=[], state="disabled")
+            self.session.set("")
             return
+        self.store = EventStore(self.selected_file)
+        sessions = self.store.sessions()
+        self.session_dropdown.config(values=sessions, state="readonly")
+        if sessions:
+            self.session.set(sessions[-1])  # Most recent session
+
+    def add_profiling_menu(self):
+        """Profiling menu: per-run cProfile / tracemalloc capture (also enabled by MCWS_PROFILE)."""
+        self.cprofile_enabled = tk.BooleanVar(value=self.profiler.cprofile)
+        self.tracemalloc_enabled = tk.BooleanVar(value=self.profiler.tracemalloc)
+
+        def toggle():
+            self.profiler.cprofile = self.cprofile_enabled.get()
+            self.profiler.tracemalloc = self.tracemalloc_enabled.get()
+
+        menubar = tk.Menu(self.root)
+        profiling_menu = tk.Menu(menubar, tearoff=0)
+        profiling_menu.add_checkbutton(label="cProfile", variable=self.cprofile_enabled, command=toggle)
+        profiling_menu.add_checkbutton(label="tracemalloc", variable=self.tracemalloc_enabled, command=toggle)
+        menubar.add_cascade(label="Profiling", menu=profiling_menu)
+        self.root.config(menu=menubar)
+
+    def apply_window(self, event=None):
+        """Reload the events for the chosen time window and re-run the analysis."""
+        if self.selected_file:
+            with self.profiler.run("window", file=self.selected_file.name, window=self.window_preset.get()):
+                self.load_events()
+                self.run_analysis()
+
+    def load_events(self):
+        with self.profiler.run("load", file=self.selected_file.name, window=self.window_preset.get(),
+                               session=self.session.get() or None):
+            self.read_events()
+
+    def read_events(self):
+        with self.profiler.stage("load"):
+            try:
+                if self.store is not None:
+                    bounds = self.store.session_bounds(self.session.get())
+                elif self.selected_file.suffix in OPENERS:
+                    bounds = read_header(self.selected_file)
+                elif self.window_preset.get() == "Whole session":
+                    bounds = None  # No bounds needed, so don't build or extend the time index
+                else:
+                    bounds = self.time_index = open_index(self.selected_file)
+                if bounds is None:
+                    self.window_label.config(text="Session: whole file (pick a time window to see the session's times)")
+                    self.window = (None, None)
+                else:
+                    self.window_label.config(text=f"Session: {bounds.first} to {bounds.last} "
+                                                  "(custom times as HH:MM or full ISO timestamps)")
+                    self.window = resolve_window(self.window_preset.get(), self.window_from.get(),
+                                                 self.window_to.get(), bounds)
+                if self.store is not None:
+                    self.events = []  # Loaded per player in run_analysis
+                    player_names = set(self.store.players(self.session.get(), *self.window))
+                elif self.selected_file.suffix in OPENERS:
+                    self.events = list(iter_archive(self.selected_file, *self.window))  # Streamed decompression
+                else:
+                    self.events = load_events(self.selected_file, *self.window)
+            except Exception as e:
+                self.file_label.config(text=f"Error reading file: {e}")
+                return
 
         # Populate the dropdown with player names
-        player_names = set(
-            event["body"]["player"]["name"]
-            for event in self.events
-            if "player" in event.get("body", {})
-        )
+        if self.store is None:
+            with self.profiler.stage("players"):
+                player_names = set(
+                    event["body"]["player"]["name"]
+                    for event in self.events
+                    if "player" in event.get("body", {})
+                )
         self.player_dropdown["values"] = list(player_names)
-        if player_names:
+        if player_names and self.selected_player.get() not in player_names:
             self.player_dropdown.current(0)  # Select the first player by default
 
     def run_analysis(self, event=None):
+        with self.profiler.run("analysis", file=self.selected_file.name if self.selected_file else None,
+                               player=self.selected_player.get() or None, window=self.window_preset.get()):
+            self.analyze()
+
+    def analyze(self):
         selected_player = self.selected_player.get()
         if not selected_player:
             self.file_label.config(text="No player selected.")
@@ -133,27 +245,33 @@ class PlayerAssessmentApp:
         # Reset player data for the selected player
         self.player_data.clear()
 
+        if self.store is not None:
+            # Indexed per-player query instead of filtering the whole session in Python
+            with self.profiler.stage("query"):
+                self.events = self.store.events(self.session.get(), *self.window, player=selected_player)
+
         # Process events for the selected player
-        for event in self.events:
-            etype = event.get("event")
-            body = event.get("body", {})
-            player = body.get("player", {})
-            name = player.get("name", "Unknown")
-
-            if name != selected_player:
-                continue
-
-            if etype == "PlayerTransform":
-                pos = player.get("position", {})
-                x, y, z = pos.get("x"), pos.get("y"), pos.get("z")
-                if None not in (x, y, z):
-                    self.player_data[name]["positions"].append((x, y, z))
-                    self.player_data[name]["total_time"] += 1  # increment time spent
-                    if len(self.player_data[name]["positions"]) > 1:
-                        self.player_data[name]["total_distance"] += self.calculate_distance(self.player_data[name]["positions"][-2:])
-            
-            elif etype == "BlockPlaced" or etype == "BlockBroken":
-                self.player_data[name]["blocks_broken_or_placed"] += 1
+        with self.profiler.stage("events"):
+            for event in self.events:
+                etype = event.get("event")
+                body = event.get("body", {})
+                player = body.get("player", {})
+                name = player.get("name", "Unknown")
+
+                if name != selected_player:
+                    continue
+
+                if etype == "PlayerTransform":
+                    pos = player.get("position", {})
+                    x, y, z = pos.get("x"), pos.get("y"), pos.get("z")
+                    if None not in (x, y, z):
+                        self.player_data[name]["positions"].append((x, y, z))
+                        self.player_data[name]["total_time"] += 1  # increment time spent
+                        if len(self.player_data[name]["positions"]) > 1:
+                            self.player_data[name]["total_distance"] += self.calculate_distance(self.player_data[name]["positions"][-2:])
+                
+                elif etype == "BlockPlaced" or etype == "BlockBroken":
+                    self.player_data[name]["blocks_broken_or_placed"] += 1
 
         # Clear previous output
         for widget in self.output_frame.winfo_children():
@@ -168,7 +286,12 @@ class PlayerAssessmentApp:
         self.result_text.config(state="disabled")
 
         # Heatmap visualization
-        self.display_heatmap(selected_player)
+        with self.profiler.stage("figure"):
+            fig = self.display_heatmap(selected_player)
+        with self.profiler.stage("draw"):
+            heat_canvas = FigureCanvasTkAgg(fig, master=self.output_frame)
+            heat_canvas.draw()
+            heat_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     def calculate_distance(self, positions):
         dist = 0
@@ -219,11 +342,7 @@ class PlayerAssessmentApp:
         ax2.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
         ax2.set_title(f"Block Types Placed by {player_name}")
         ax2.axis('equal')
-
-        # Add the figure to Tkinter canvas
-        heat_canvas = FigureCanvasTkAgg(fig, master=self.output_frame)
-        heat_canvas.draw()
-        heat_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        return fig  # Drawn onto the Tkinter canvas by analyze()
 
     def load_prompt(self, filename):
         """Load a prompt from a text file in the /prompts directory."""
@@ -250,13 +369,14 @@ class PlayerAssessmentApp:
 
         try:
             # Send the assessment text to Azure OpenAI
-            response = self.azure_client.chat.completions.create(
-                model="gpt-4o",  # Replace with your deployment name
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"{criteria_prompt}\n\n{assessment_text}"}
-                ]
-            )
+            with self.profiler.run("rubric"), self.profiler.stage("azure"):
+                response = self.azure_client.chat.completions.create(
+                    model="gpt-4o",  # Replace with your deployment name
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"{criteria_prompt}\n\n{assessment_text}"}
+                    ]
+                )
 
             # Extract the AI's response
             ai_response = response.choices[0].message.content
@@ -303,13 +423,14 @@ class PlayerAssessmentApp:
 
         try:
             # Send the player data and criteria to Azure OpenAI
-            response = self.azure_client.chat.completions.create(
-                model="gpt-4o",  # Replace with your deployment name
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"{assessment_prompt}\n\nCriteria: {criteria_text}\n\nPlayer Data: {json.dumps(player_data)}"}
-                ]
-            )
+            with self.profiler.run("assessment", player=selected_player), self.profiler.stage("azure"):
+                response = self.azure_client.chat.completions.create(
+                    model="gpt-4o",  # Replace with your deployment name
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"{assessment_prompt}\n\nCriteria: {criteria_text}\n\nPlayer Data: {json.dumps(player_data)}"}
+                    ]
+                )
 
             # Extract the AI's response
             ai_response = response.choices[0].message.content
@@ -0,0 +1,183 @@
+import argparse
+import itertools
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from timeindex import iter_records
+from archive import OPENERS, iter_archive
+from sqlite_store import EventStore
+
+_TOKEN_RE = re.compile(r"[\w']+")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Left out of the word-frequency chart (still searchable)
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "but", "is", "are", "was", "were", "be", "to", "of", "in", "on", "at",
+    "it", "its", "i", "im", "i'm", "you", "me", "my", "we", "he", "she", "they", "this", "that", "for",
+    "with", "so", "do", "dont", "don't", "not", "no", "yes", "can", "just", "u", "have", "has", "what"
+}
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ChatIndex:
+    """Inverted index and word counts over PlayerMessage chat, across any number of sessions.
+
+    Messages are added one at a time (add_event / update_file), so the index and the per-sender
+    counts stay current as new chat arrives without rescanning old messages.
+    """
+
+    def __init__(self):
+        self.messages = []  # message id -> (session, timestamp, sender, text)
+        self.tokens = []  # message id -> token list, used to confirm phrase matches
+        self.postings = defaultdict(list)  # token -> ascending message ids
+        self.word_counts = defaultdict(Counter)  # sender -> token counts
+        self.message_counts = Counter()  # sender -> messages
+        self.character_counts = Counter()  # sender -> total message length
+        self.offsets = {}  # event file -> bytes indexed, database -> last event id indexed
+        self.sessions = {}  # session name -> [file or archive it is indexed from, records read]
+
+    def add(self, session, timestamp, sender, text):
+        message_id = len(self.messages)
+        tokens = tokenize(text)
+        self.messages.append((session, timestamp, sender, text))
+        self.tokens.append(tokens)
+        for token in set(tokens):
+            self.postings[token].append(message_id)
+        self.word_counts[sender].update(tokens)
+        self.message_counts[sender] += 1
+        self.character_counts[sender] += len(text)
+
+    def add_event(self, event, session=None):
+        if event.get("event") != "PlayerMessage":
+            return
+        body = event.get("body", {})
+        text = body.get("message")
+        if isinstance(text, str):
+            self.add(session, event.get("timestamp"), body.get("sender", "Unknown"), text)
+
+    def update_file(self, path):
+        """Index chat appended to an event file since the last call. Returns the number of new messages.
+
+        Sessions are tracked by name, so a session is not indexed twice when its JSON file is archived:
+        the archive only adds records the JSON file had not reached yet, and once a session has been read
+        from its archive the JSON file is skipped.
+        """
+        path = Path(path)
+        before = len(self.messages)
+        session = path.name.split(".")[0]
+        source, records = self.sessions.get(session, (None, 0))
+        if path.suffix in OPENERS:
+            if source is None or source.suffix not in OPENERS:  # Archives never change
+                # If the JSON file was indexed before it was archived, only read what it had not reached
+                for event in itertools.islice(iter_archive(path), records, None):
+                    self.add_event(event, session)
+                    records += 1
+                self.sessions[session] = [path, records]
+        elif source is None or source == path:
+            offset = self.offsets.get(path, 0)
+            for _, end, event in iter_records(path, offset):
+                self.add_event(event, session)
+                offset = end
+                records += 1
+            self.offsets[path] = offset
+            self.sessions[session] = [path, records]
+        return len(self.messages) - before
+
+    def update_store(self, store):
+        """Index chat added to a SQLite EventStore since the last call, using its messages table."""
+        before = len(self.messages)
+        last_id = self.offsets.get(store.path, 0)
+        rows = store.conn.execute(
+            "SELECT m.event_id, s.name, e.timestamp, m.sender, m.message FROM messages m "
+            "JOIN events e ON e.id = m.event_id JOIN sessions s ON s.id = m.session_id "
+            "WHERE m.event_id > ? ORDER BY m.event_id", (last_id,)
+        )
+        for event_id, session, timestamp, sender, text in rows:
+            if isinstance(text, str):
+                self.add(session, timestamp, sender or "Unknown", text)
+            last_id = event_id
+        self.offsets[store.path] = last_id
+        return len(self.messages) - before
+
+    def search(self, query, sender=None, sessions=None):
+        """Messages matching every keyword and every "quoted phrase" in the query, oldest first."""
+        phrases = []
+        for phrase, word in _QUERY_RE.findall(query):
+            tokens = tokenize(phrase or word)
+            if tokens:
+                phrases.append(tokens)
+        if not phrases:
+            return []
+
+        # Intersect postings, rarest token first so the candidate set shrinks fastest
+        words = sorted({token for tokens in phrases for token in tokens}, key=lambda t: len(self.postings.get(t, ())))
+        candidates = set(self.postings.get(words[0], ()))
+        for token in words[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(self.postings.get(token, ()))
+
+        results = []
+        for message_id in sorted(candidates):
+            session, timestamp, message_sender, text = self.messages[message_id]
+            if sender is not None and message_sender != sender:
+                continue
+            if sessions is not None and session not in sessions:
+                continue
+            tokens = self.tokens[message_id]
+            if all(len(p) == 1 or _contains(tokens, p) for p in phrases):
+                results.append({"session": session, "timestamp": timestamp, "sender": message_sender, "message": text})
+        return results
+
+    def top_words(self, n=15, sender=None, skip_stop_words=True):
+        counts = self.word_counts.get(sender, Counter()) if sender is not None else self.total_counts()
+        ranked = ((word, count) for word, count in counts.most_common()
+                  if not (skip_stop_words and word in STOP_WORDS))
+        return [item for item, _ in zip(ranked, range(n))]
+
+    def total_counts(self):
+        total = Counter()
+        for counts in self.word_counts.values():
+            total.update(counts)
+        return total
+
+    def average_length(self, sender=None):
+        """Average message length in characters (per sender, or overall)."""
+        if sender is not None:
+            messages, characters = self.message_counts[sender], self.character_counts[sender]
+        else:
+            messages, characters = sum(self.message_counts.values()), sum(self.character_counts.values())
+        return characters / messages if messages else 0.0
+
+
+def _contains(tokens, phrase):
+    first = phrase[0]
+    for i in range(len(tokens) - len(phrase) + 1):
+        if tokens[i] == first and tokens[i:i + len(phrase)] == phrase:
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Search chat across sessions, e.g. diamond "creeper behind".')
+    parser.add_argument("query", help='keywords and "quoted phrases" that must all appear')
+    parser.add_argument("files", nargs="+", help="events_*.json files, archives or .db stores to search")
+    parser.add_argument("--sender", help="only messages from this player")
+    args = parser.parse_args()
+
+    index = ChatIndex()
+    for file in args.files:
+        if file.endswith(".db"):
+            store = EventStore(file)
+            index.update_store(store)
+            store.conn.close()
+        else:
+            index.update_file(file)
+    results = index.search(args.query, sender=args.sender)
+    for result in results:
+        print(f"[{result['session']} {result['timestamp']}] {result['sender']}: {result['message']}")
+    print(f"{len(results)} of {len(index.messages)} messages matched")
@@ -1,12 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
-import json
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from collections import defaultdict, Counter
 from pathlib import Path
 import math
 from matplotlib.backends.backend_pdf import PdfPages  # Import for PDF export
+from timeindex import WINDOW_PRESETS, open_index, load_events, resolve_window
+from spatial import SpatialIndex
+from sqlite_store import EventStore
+from archive import OPENERS, iter_archive, read_header
+from chat_index import ChatIndex
+from profiling import RunProfiler
 
 class MinecraftDataLab:
     def __init__(self, root):
@@ -22,14 +27,47 @@ class MinecraftDataLab:
             "positions": []  # list of positions
         })
         self.selected_file = None
+        self.time_index = None
+        self.spatial_index = SpatialIndex()
+        self.store = None  # set when a SQLite database is loaded instead of a JSON file
+        self.chat_index = ChatIndex()  # chat in the analysed window
+        self.chat_library = ChatIndex()  # chat from every session next to the loaded file, updated on each search
 
         # UI setup
+        self.status_bar = ttk.Label(root, text="", relief=tk.SUNKEN, anchor="w")
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)  # Packed first so the expanding output never hides it
+        self.profiler = RunProfiler("lab", report=lambda summary: self.status_bar.config(text=summary))
+        self.add_profiling_menu()
+
         self.file_label = ttk.Label(root, text="No file selected")
         self.file_label.pack(pady=5)
 
         self.select_button = ttk.Button(root, text="Load Log File", command=self.load_file)
         self.select_button.pack(pady=5)
 
+        # Session picker for SQLite databases
+        self.session = tk.StringVar()
+        self.session_dropdown = ttk.Combobox(root, textvariable=self.session, state="disabled", width=40)
+        self.session_dropdown.pack(pady=5)
+        self.session_dropdown.bind("<<ComboboxSelected>>", lambda event: self.run_analysis())
+
+        # Time window selector (only the matching slice of the file is loaded)
+        window_frame = ttk.Frame(root)
+        window_frame.pack(pady=5)
+        self.window_preset = tk.StringVar(value="Whole session")
+        ttk.Label(window_frame, text="Time window:").pack(side=tk.LEFT)
+        self.window_dropdown = ttk.Combobox(window_frame, textvariable=self.window_preset,
+                                            values=list(WINDOW_PRESETS), state="readonly", width=16)
+        self.window_dropdown.pack(side=tk.LEFT, padx=5)
+        ttk.Label(window_frame, text="From").pack(side=tk.LEFT)
+        self.window_from = ttk.Entry(window_frame, width=10)
+        self.window_from.pack(side=tk.LEFT, padx=5)
+        ttk.Label(window_frame, text="To").pack(side=tk.LEFT)
+        self.window_to = ttk.Entry(window_frame, width=10)
+        self.window_to.pack(side=tk.LEFT, padx=5)
+        self.window_label = ttk.Label(root, text="")
+        self.window_label.pack()
+
         self.analyze_button = ttk.Button(root, text="Run Analysis", command=self.run_analysis, state="disabled")
         self.analyze_button.pack(pady=10)
 
@@ -40,6 +78,48 @@ class MinecraftDataLab:
         self.quit_button = ttk.Button(root, text="Quit", command=root.quit)
         self.quit_button.pack(pady=5)
 
+        # Region filter: who was inside a box / circle / chunk, and what was built there
+        region_frame = ttk.Frame(root)
+        region_frame.pack(pady=5)
+        self.region_shape = tk.StringVar(value="Box")
+        ttk.Label(region_frame, text="Region:").pack(side=tk.LEFT)
+        shape_dropdown = ttk.Combobox(region_frame, textvariable=self.region_shape,
+                                      values=["Box", "Radius", "Chunk"], state="readonly", width=8)
+        shape_dropdown.pack(side=tk.LEFT, padx=5)
+        shape_dropdown.bind("<<ComboboxSelected>>", self.update_region_labels)
+        ttk.Label(region_frame, text="Dim").pack(side=tk.LEFT)
+        self.region_dimension = ttk.Entry(region_frame, width=3)
+        self.region_dimension.insert(0, "0")
+        self.region_dimension.pack(side=tk.LEFT, padx=2)
+        self.region_labels = []
+        self.region_entries = []
+        for _ in range(4):
+            label = ttk.Label(region_frame)
+            label.pack(side=tk.LEFT)
+            entry = ttk.Entry(region_frame, width=7)
+            entry.pack(side=tk.LEFT, padx=2)
+            self.region_labels.append(label)
+            self.region_entries.append(entry)
+        ttk.Button(region_frame, text="Query Region", command=self.query_region).pack(side=tk.LEFT, padx=5)
+        self.update_region_labels()
+
+        self.region_text = tk.Text(root, height=6, state="disabled")
+        self.region_text.pack(fill=tk.X, padx=10)
+
+        # Chat search: keywords and "quoted phrases", in this session or across all of them
+        chat_frame = ttk.Frame(root)
+        chat_frame.pack(pady=5)
+        ttk.Label(chat_frame, text="Chat search:").pack(side=tk.LEFT)
+        self.chat_query = ttk.Entry(chat_frame, width=30)
+        self.chat_query.pack(side=tk.LEFT, padx=5)
+        self.chat_query.bind("<Return>", lambda event: self.search_chat())
+        self.chat_all_sessions = tk.BooleanVar(value=False)
+        ttk.Checkbutton(chat_frame, text="All sessions", variable=self.chat_all_sessions).pack(side=tk.LEFT)
+        ttk.Button(chat_frame, text="Search Chat", command=self.search_chat).pack(side=tk.LEFT, padx=5)
+
+        self.chat_text = tk.Text(root, height=6, state="disabled")
+        self.chat_text.pack(fill=tk.X, padx=10)
+
         self.output_frame = ttk.Frame(root)
         self.output_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -49,52 +129,116 @@ class MinecraftDataLab:
     def load_file(self):
         file_path = filedialog.askopenfilename(
             title="Select Minecraft Log File",
-            filetypes=[("JSON files", "*.json")]
+            filetypes=[("Event files", "*.json *.db *.xz *.gz"), ("JSON files", "*.json"),
+                       ("SQLite databases", "*.db"), ("Archives", "*.xz *.gz")]
         )
         if file_path:
             self.selected_file = Path(file_path)
             self.file_label.config(text=f"Loaded: {self.selected_file.name}")
+            self.load_store()
             self.analyze_button.config(state="normal")
             self.export_button.config(state="normal")  # Enable export button after loading a file
             self.run_analysis()
 
-    def run_analysis(self):
-        try:
-            with open(self.selected_file, "r") as f:
-                self.events = json.load(f)
-        except Exception as e:
-            self.file_label.config(text=f"Error reading file: {e}")
+    def load_store(self):
+        """Open the SQLite database and list its sessions, or clear the store for JSON files."""
+        if self.store is not None:
+            self.store.conn.close()
+            self.store = None
+        if self.selected_file.suffix != ".db":
+            self.session_dropdown.config(values=[], state="disabled")
+            self.session.set("")
             return
+        self.store = EventStore(self.selected_file)
+        sessions = self.store.sessions()
+        self.session_dropdown.config(values=sessions, state="readonly")
+        if sessions:
+            self.session.set(sessions[-1])  # Most recent session
+
+    def selected_window(self):
+        """Return (start, end) for the time window selector; None means unbounded."""
+        if self.store is not None:
+            bounds = self.store.session_bounds(self.session.get())
+        elif self.selected_file.suffix in OPENERS:
+            bounds = read_header(self.selected_file)  # Archive header holds the session bounds
+        elif self.window_preset.get() == "Whole session":
+            # No bounds needed, so don't build or extend the time index
+            self.window_label.config(text="Session: whole file (pick a time window to see the session's times)")
+            return None, None
+        else:
+            bounds = self.time_index = open_index(self.selected_file)
+        self.window_label.config(text=f"Session: {bounds.first} to {bounds.last} "
+                                      "(custom times as HH:MM or full ISO timestamps)")
+        return resolve_window(self.window_preset.get(), self.window_from.get(), self.window_to.get(), bounds)
+
+    def add_profiling_menu(self):
+        """Profiling menu: per-run cProfile / tracemalloc capture (also enabled by MCWS_PROFILE)."""
+        self.cprofile_enabled = tk.BooleanVar(value=self.profiler.cprofile)
+        self.tracemalloc_enabled = tk.BooleanVar(value=self.profiler.tracemalloc)
+
+        def toggle():
+            self.profiler.cprofile = self.cprofile_enabled.get()
+            self.profiler.tracemalloc = self.tracemalloc_enabled.get()
+
+        menubar = tk.Menu(self.root)
+        profiling_menu = tk.Menu(menubar, tearoff=0)
+        profiling_menu.add_checkbutton(label="cProfile", variable=self.cprofile_enabled, command=toggle)
+        profiling_menu.add_checkbutton(label="tracemalloc", variable=self.tracemalloc_enabled, command=toggle)
+        menubar.add_cascade(label="Profiling", menu=profiling_menu)
+        self.root.config(menu=menubar)
+
+    def run_analysis(self):
+        with self.profiler.run("analysis", file=self.selected_file.name, window=self.window_preset.get(),
+                               session=self.session.get() or None):
+            self.analyze()
+
+    def analyze(self):
+        with self.profiler.stage("load"):
+            try:
+                start, end = self.selected_window()
+                if self.store is not None:
+                    self.events = self.store.events(self.session.get(), start, end)  # Indexed SQL query
+                elif self.selected_file.suffix in OPENERS:
+                    self.events = list(iter_archive(self.selected_file, start, end))  # Streamed decompression
+                else:
+                    self.events = load_events(self.selected_file, start, end)
+            except Exception as e:
+                self.file_label.config(text=f"Error reading file: {e}")
+                return
 
         # Reset player data for each analysis
         self.player_data.clear()
+        self.spatial_index = SpatialIndex()
+        self.chat_index = ChatIndex()
+        session = self.session.get() if self.store is not None else self.selected_file.name.split(".")[0]
 
         # Process events
-        for event in self.events:
-            etype = event.get("event")
-            body = event.get("body", {})
-
-            if etype == "PlayerMessage":
-                # Handle player messages if needed (not required in this case)
-                pass
-
-            elif etype == "PlayerTransform":
-                player = body.get("player", {})
-                name = player.get("name", "Unknown")
-                pos = player.get("position", {})
-                x, y, z = pos.get("x"), pos.get("y"), pos.get("z")
-                if None not in (x, y, z):
-                    self.player_data[name]["positions"].append((x, y, z))
-                    self.player_data[name]["total_time"] += 1  # increment time spent
-                    if len(self.player_data[name]["positions"]) > 1:
-                        self.player_data[name]["total_distance"] += self.calculate_distance(self.player_data[name]["positions"][-2:])
-            
-            elif etype == "BlockPlaced" or etype == "BlockBroken":
-                # Assuming a block placed/broken event
-                player = body.get("player", {})
-                name = player.get("name", "Unknown")
-                if name in self.player_data:
-                    self.player_data[name]["blocks_broken_or_placed"] += 1
+        with self.profiler.stage("events"):
+            for event in self.events:
+                etype = event.get("event")
+                body = event.get("body", {})
+                self.spatial_index.add_event(event)
+
+                if etype == "PlayerMessage":
+                    self.chat_index.add_event(event, session)
+
+                elif etype == "PlayerTransform":
+                    player = body.get("player", {})
+                    name = player.get("name", "Unknown")
+                    pos = player.get("position", {})
+                    x, y, z = pos.get("x"), pos.get("y"), pos.get("z")
+                    if None not in (x, y, z):
+                        self.player_data[name]["positions"].append((x, y, z))
+                        self.player_data[name]["total_time"] += 1  # increment time spent
+                        if len(self.player_data[name]["positions"]) > 1:
+                            self.player_data[name]["total_distance"] += self.calculate_distance(self.player_data[name]["positions"][-2:])
+                
+                elif etype == "BlockPlaced" or etype == "BlockBroken":
+                    # Assuming a block placed/broken event
+                    player = body.get("player", {})
+                    name = player.get("name", "Unknown")
+                    if name in self.player_data:
+                        self.player_data[name]["blocks_broken_or_placed"] += 1
 
         # Clear previous output
         for widget in self.output_frame.winfo_children():
@@ -103,10 +247,98 @@ class MinecraftDataLab:
         # Display summary of player activities
         summary_text = "\n".join([f"{name}: Time = {data['total_time']}s, Blocks = {data['blocks_broken_or_placed']}, Distance = {data['total_distance']} blocks" 
                                   for name, data in self.player_data.items()])
+        summary_text += "\n" + self.chat_summary()
         self.summary_label.config(text=summary_text)
 
         # Heatmap visualization
-        self.display_heatmap()
+        with self.profiler.stage("figure"):
+            fig = self.display_heatmap()
+        with self.profiler.stage("draw"):
+            heat_canvas = FigureCanvasTkAgg(fig, master=self.output_frame)
+            heat_canvas.draw()
+            heat_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def update_region_labels(self, event=None):
+        labels = {
+            "Box": ["X1", "Z1", "X2", "Z2"],
+            "Radius": ["X", "Z", "Radius", ""],
+            "Chunk": ["Chunk X", "Chunk Z", "", ""]
+        }[self.region_shape.get()]
+        for label, entry, text in zip(self.region_labels, self.region_entries, labels):
+            label.config(text=text)
+            entry.config(state="normal" if text else "disabled")
+
+    def query_region(self):
+        """Run a region query against the spatial index and list the results."""
+        try:
+            dimension = int(self.region_dimension.get() or 0)
+            values = [float(e.get()) for e in self.region_entries if str(e.cget("state")) == "normal"]
+            shape = self.region_shape.get()
+            if shape == "Box":
+                result = self.spatial_index.query_box(dimension, *values)
+            elif shape == "Radius":
+                result = self.spatial_index.query_radius(dimension, *values)
+            else:
+                result = self.spatial_index.query_chunk(dimension, int(values[0]), int(values[1]))
+        except (ValueError, TypeError):
+            result = None
+
+        lines = []
+        if result is None:
+            lines.append("Enter numeric coordinates for the selected region shape.")
+        elif not result["players"] and not result["blocks"]:
+            lines.append("Nobody was in this region.")
+        else:
+            for name, info in sorted(result["players"].items()):
+                visits = ", ".join(f"{a[11:19]}-{b[11:19]}" for a, b in info["intervals"])
+                lines.append(f"{name}: {info['dwell']:.0f}s inside, {info['samples']} updates ({visits})")
+            block_counts = Counter(block["block"] for block in result["blocks"])
+            blocks_text = ", ".join(f"{block_id} x{count}" for block_id, count in block_counts.most_common())
+            lines.append(f"Blocks: {len(result['blocks'])} {('(' + blocks_text + ')') if blocks_text else ''}")
+
+        self.region_text.config(state="normal")
+        self.region_text.delete("1.0", tk.END)
+        self.region_text.insert(tk.END, "\n".join(lines))
+        self.region_text.config(state="disabled")
+
+    def chat_summary(self):
+        chat = self.chat_index
+        lines = [f"Chat: {len(chat.messages)} messages, average length {chat.average_length():.1f} characters"]
+        for sender in sorted(chat.message_counts):
+            lines.append(f"  {sender}: {chat.message_counts[sender]} messages, "
+                         f"average {chat.average_length(sender):.1f} characters")
+        return "\n".join(lines)
+
+    def search_chat(self):
+        query = self.chat_query.get()
+        if self.chat_all_sessions.get() and self.selected_file is not None:
+            # Only chat added since the previous search is read
+            if self.store is not None:
+                self.chat_library.update_store(self.store)
+            else:
+                # The index tracks sessions by name, so an archived session is not read twice
+                folder = self.selected_file.parent
+                for path in sorted(folder.glob("events_*.json")) + sorted(folder.glob("events_*.archive.*")):
+                    if path.suffix == ".json" or path.suffix in OPENERS:
+                        self.chat_library.update_file(path)
+            results = self.chat_library.search(query)
+        else:
+            results = self.chat_index.search(query)
+
+        lines = [f"{r['session']} {(r['timestamp'] or '')[11:19]} {r['sender']}: {r['message']}" for r in results]
+        lines.append(f"{len(results)} matching messages")
+        self.chat_text.config(state="normal")
+        self.chat_text.delete("1.0", tk.END)
+        self.chat_text.insert(tk.END, "\n".join(lines))
+        self.chat_text.config(state="disabled")
+
+    def plot_word_frequency(self, ax):
+        top = self.chat_index.top_words(15)
+        if top:
+            words, counts = zip(*reversed(top))
+            ax.barh(words, counts)
+        ax.set_title(f"Chat Word Frequency (avg message {self.chat_index.average_length():.1f} chars)")
+        ax.set_xlabel("Occurrences")
 
     def calculate_distance(self, positions):
         dist = 0
@@ -159,7 +391,7 @@ class MinecraftDataLab:
         ax2.axis("equal")  # Keep the X and Z scales proportional
 
         # Pie Chart for Block Types
-        ax3 = fig.add_subplot(212)
+        ax3 = fig.add_subplot(223)
         block_counts = Counter(
             event["body"]["block"]["id"]
             for event in self.events
@@ -172,10 +404,9 @@ class MinecraftDataLab:
         ax3.set_title("Distribution of Block Types Placed")
         ax3.axis('equal')  # Ensures the pie chart is circular
 
-        # Add the combined figure to Tkinter canvas
-        heat_canvas = FigureCanvasTkAgg(fig, master=self.output_frame)
-        heat_canvas.draw()
-        heat_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Word frequency of chat messages
+        self.plot_word_frequency(fig.add_subplot(224))
+        return fig  # Drawn onto the Tkinter canvas by analyze()
 
     def export_to_pdf(self):
         """Export the visuals and summary data to a PDF."""
@@ -199,6 +430,7 @@ class MinecraftDataLab:
                 ax.axis("off")  # Turn off the axis
                 summary_text = "\n".join([f"{name}: Time = {data['total_time']}s, Blocks = {data['blocks_broken_or_placed']}, Distance = {data['total_distance']} blocks"
                                           for name, data in self.player_data.items()])
+                summary_text += "\n" + self.chat_summary()
                 ax.text(0.5, 0.5, summary_text, fontsize=12, ha="center", va="center", wrap=True)
                 ax.set_title("Player Activity Summary", fontsize=16)
                 pdf.savefig(fig)  # Save the summary page
@@ -242,7 +474,7 @@ class MinecraftDataLab:
                 ax2.grid(True)
                 ax2.axis("equal")
 
-                ax3 = fig.add_subplot(212)
+                ax3 = fig.add_subplot(223)
                 block_counts = Counter(
                     event["body"]["block"]["id"]
                     for event in self.events
@@ -255,6 +487,8 @@ class MinecraftDataLab:
                 ax3.set_title("Distribution of Block Types Placed")
                 ax3.axis('equal')
 
+                self.plot_word_frequency(fig.add_subplot(224))
+
                 pdf.savefig(fig)  # Save the visuals page
                 plt.close(fig)
 
@@ -1,18 +1,119 @@
 import tkinter as tk
 from tkinter import filedialog, ttk
-import json
+import time
+from bisect import bisect_right
+from datetime import datetime
 from pathlib import Path
+from timeindex import iter_records, to_seconds
+
+POLL_MS = 1000  # how often the file is checked for new events
+FRAME_MS = 100  # minimum time between redraws
+FRAME_BUDGET = 0.008  # seconds of row updates per redraw; the rest waits for the next frame
+# A keyframe copies every player, so the gap between keyframes grows with the player count: memory stays
+# a small fixed cost per event (not per player per event), and a seek replays at most ~8 events per player.
+KEYFRAME_EVENTS = 500  # snapshot at least every N events...
+KEYFRAME_EVENTS_PER_PLAYER = 8  # ...or every N events per known player, if that is longer...
+KEYFRAME_SECONDS = 30  # ...or every N seconds of session time, whichever comes first
+SEEK_DELAY_MS = 30  # coalesce slider drags into one seek
+
+STATE_FIELDS = ("joined", "position", "dimension", "last_seen")
+COLUMNS = ("status", "x", "y", "z", "dimension", "last_seen")
+HEADINGS = {"#0": "Player", "status": "Status", "x": "X", "y": "Y", "z": "Z",
+            "dimension": "Dim", "last_seen": "Last Seen"}
+
+
+def _state(players, name):
+    return players.setdefault(name, {"joined": True, "position": None, "dimension": None, "last_seen": None})
+
+
+def apply_event(players, event):
+    """Fold one event into the {name: state} dict. Returns the player name that changed, or None."""
+    event_type = event.get("event")
+    body = event.get("body", {})
+
+    if event_type == "PlayerJoin":
+        player_name = body.get("playerName") or body.get("player", {}).get("name", "Unknown")
+        state = _state(players, player_name)
+        state["joined"] = True
+        state["last_seen"] = event.get("timestamp")
+        return player_name
+
+    elif event_type == "PlayerLeave":
+        player_name = body.get("playerName") or body.get("player", {}).get("name", "Unknown")
+        state = _state(players, player_name)
+        state["joined"] = False
+        state["last_seen"] = event.get("timestamp")
+        return player_name
+
+    elif event_type == "PlayerTransform":
+        player = body.get("player", {})
+        name = player.get("name", "Unknown")
+        pos = player.get("position", {})
+        if name:
+            state = _state(players, name)
+            state["position"] = (
+                round(pos.get("x", 0), 1),
+                round(pos.get("y", 0), 1),
+                round(pos.get("z", 0), 1)
+            )
+            state["dimension"] = player.get("dimension", 0)
+            state["joined"] = True
+            state["last_seen"] = event.get("timestamp")
+            return name
+
+    elif event_type == "PlayerMessage":
+        name = body.get("sender", "Unknown")
+        state = _state(players, name)
+        state["joined"] = True
+        state["last_seen"] = event.get("timestamp")
+        return name
+
+    return None
+
+
+def snapshot(players):
+    """Compact copy of the player state for a keyframe: one tuple per player, in STATE_FIELDS order."""
+    return {name: tuple(state[field] for field in STATE_FIELDS) for name, state in players.items()}
+
+
+def restore(frame):
+    return {name: dict(zip(STATE_FIELDS, values)) for name, values in frame.items()}
+
+
+def parse_region(text):
+    """"x1,z1,x2,z2" -> box bounds, blank -> None. Raises ValueError for anything else."""
+    if not text.strip():
+        return None
+    x1, z1, x2, z2 = (float(part) for part in text.split(","))
+    return min(x1, x2), min(z1, z2), max(x1, x2), max(z1, z2)
+
 
 class MinecraftMonitorApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Minecraft Live Player Monitor")
-        self.root.geometry("500x400")
+        self.root.geometry("700x500")
 
         self.selected_file = None
-        self.player_positions = {}
-        self.joined_players = set()
-        self.last_data = []
+        self.players = {}  # name -> {"joined", "position", "dimension", "last_seen"}
+        self.offset = 0  # file offset just after the last event read
+        self.dirty = set()  # players whose row needs updating
+        self.rendered = {}  # name -> values last written to the row
+        self.detached = set()  # rows hidden by the filter
+        self.redraw_pending = False
+        self.name_filter = ""
+        self.region_filter = None
+        self.poll_job = None
+
+        # Timeline: keyframes are (session seconds, file offset, player snapshot before that event)
+        self.keyframes = []
+        self.keyframe_times = []
+        self.events_since_keyframe = 0
+        self.first_time = None
+        self.last_time = None
+        self.view = None  # player state at the scrubbed time, None when following live
+        self.seek_job = None
+        self.updating_scale = False
 
         # UI Layout
         self.label = ttk.Label(root, text="Select event JSON file to monitor:")
@@ -24,11 +125,39 @@ class MinecraftMonitorApp:
         self.status = ttk.Label(root, text="", foreground="blue")
         self.status.pack(pady=5)
 
+        filter_frame = ttk.Frame(root)
+        filter_frame.pack(fill=tk.X, padx=10)
+        ttk.Label(filter_frame, text="Name:").pack(side=tk.LEFT)
+        self.name_entry = ttk.Entry(filter_frame, width=15)
+        self.name_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="Region (x1,z1,x2,z2):").pack(side=tk.LEFT)
+        self.region_entry = ttk.Entry(filter_frame, width=20)
+        self.region_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Filter", command=self.apply_filter).pack(side=tk.LEFT)
+        self.name_entry.bind("<Return>", lambda event: self.apply_filter())
+        self.region_entry.bind("<Return>", lambda event: self.apply_filter())
+
+        timeline_frame = ttk.Frame(root)
+        timeline_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.time_label = ttk.Label(timeline_frame, text="Live", width=10)
+        self.time_label.pack(side=tk.LEFT)
+        self.timeline = ttk.Scale(timeline_frame, from_=0, to=1, orient=tk.HORIZONTAL, command=self.on_scrub)
+        self.timeline.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(timeline_frame, text="Live", command=self.go_live).pack(side=tk.LEFT)
+
         self.output_frame = ttk.Frame(root)
         self.output_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.player_list = tk.Text(self.output_frame, state="disabled", height=20)
+        self.player_list = ttk.Treeview(self.output_frame, columns=COLUMNS)
+        for column, heading in HEADINGS.items():
+            self.player_list.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.player_list.column(column, width=160 if column in ("#0", "last_seen") else 70, anchor=tk.W)
+        scrollbar = ttk.Scrollbar(self.output_frame, orient=tk.VERTICAL, command=self.player_list.yview)
+        self.player_list.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.player_list.pack(fill=tk.BOTH, expand=True)
+        self.sort_column = "#0"
+        self.sort_reverse = False
 
     def select_file(self):
         file_path = filedialog.askopenfilename(
@@ -38,67 +167,216 @@ class MinecraftMonitorApp:
         if file_path:
             self.selected_file = Path(file_path)
             self.status.config(text=f"Monitoring: {self.selected_file.name}")
-            self.joined_players.clear()
-            self.player_positions.clear()
-            self.last_data = []
-            self.update_loop()
+            self.reset()
+            if self.poll_job is None:
+                self.update_loop()
+
+    def reset(self):
+        self.players.clear()
+        self.dirty.clear()
+        self.offset = 0
+        self.player_list.delete(*self.player_list.get_children(""), *self.detached)
+        self.rendered.clear()
+        self.detached.clear()
+        self.keyframes.clear()
+        self.keyframe_times.clear()
+        self.events_since_keyframe = 0
+        self.first_time = self.last_time = None
+        self.view = None
+        self.time_label.config(text="Live")
 
     def update_loop(self):
         if self.selected_file and self.selected_file.exists():
             try:
-                with open(self.selected_file, "r") as f:
-                    data = json.load(f)
-                    if data != self.last_data:
-                        self.last_data = data
-                        self.process_events(data)
+                if self.selected_file.stat().st_size < self.offset:
+                    self.reset()  # File was replaced or truncated; start over
+                self.process_events()
             except Exception as e:
                 self.status.config(text=f"Error: {e}", foreground="red")
 
-        self.root.after(2000, self.update_loop)  # Check every 2 seconds
+        self.poll_job = self.root.after(POLL_MS, self.update_loop)
+
+    def process_events(self):
+        """Read only the events appended since the last poll and mark the affected players."""
+        for start, end, event in iter_records(self.selected_file, self.offset):
+            timestamp = event.get("timestamp")
+            if timestamp:
+                seconds = to_seconds(timestamp)
+                interval = max(KEYFRAME_EVENTS, KEYFRAME_EVENTS_PER_PLAYER * len(self.players))
+                if (not self.keyframes or self.events_since_keyframe >= interval
+                        or seconds - self.keyframe_times[-1] >= KEYFRAME_SECONDS):
+                    self.keyframes.append((seconds, start, snapshot(self.players)))
+                    self.keyframe_times.append(seconds)
+                    self.events_since_keyframe = 0
+                if self.first_time is None:
+                    self.first_time = seconds
+                self.last_time = max(self.last_time or seconds, seconds)
+
+            name = apply_event(self.players, event)
+            if name is not None and self.view is None:
+                self.dirty.add(name)
+            self.events_since_keyframe += 1
+            self.offset = end
+
+        self.update_timeline()
+        self.schedule_redraw()
+
+    def update_timeline(self):
+        """Stretch the slider over the session; while live, keep the handle at the end."""
+        if self.first_time is None:
+            return
+        self.updating_scale = True
+        self.timeline.config(from_=self.first_time, to=max(self.last_time, self.first_time + 1))
+        if self.view is None:
+            self.timeline.set(self.last_time)
+        self.updating_scale = False
+
+    def state_at(self, target):
+        """Player state at session time `target`: nearest earlier keyframe plus a short replay."""
+        i = bisect_right(self.keyframe_times, target) - 1
+        if i < 0:
+            return {}
+        _, offset, frame = self.keyframes[i]
+        players = restore(frame)
+        # Server timestamps are naive ISO strings, so they compare in time order as plain strings
+        target_text = datetime.fromtimestamp(target).isoformat()
+        for start, _, event in iter_records(self.selected_file, offset):
+            if start >= self.offset:
+                break  # Not read by the live view yet
+            timestamp = event.get("timestamp")
+            if timestamp and timestamp > target_text:
+                break
+            apply_event(players, event)
+        return players
+
+    def on_scrub(self, value):
+        if self.updating_scale or self.first_time is None:
+            return
+        if self.seek_job is not None:
+            self.root.after_cancel(self.seek_job)
+        self.seek_job = self.root.after(SEEK_DELAY_MS, lambda: self.seek(float(value)))
 
-    def process_events(self, events):
-        for event in events:
-            event_type = event.get("event")
-            body = event.get("body", {})
+    def seek(self, target):
+        self.seek_job = None
+        previous = self.current_players()
+        self.view = self.state_at(target)
+        self.time_label.config(text=datetime.fromtimestamp(target).strftime("%H:%M:%S"))
+        # Only rows that differ between the old and new view need redrawing
+        self.dirty.update(name for name in set(previous) | set(self.view)
+                          if previous.get(name) != self.view.get(name))
+        self.schedule_redraw()
 
-            if event_type == "PlayerJoin":
-                player_name = body.get("playerName", "Unknown")
-                self.joined_players.add(player_name)
+    def go_live(self):
+        previous = self.current_players()
+        self.view = None
+        self.time_label.config(text="Live")
+        self.dirty.update(name for name in set(previous) | set(self.players)
+                          if previous.get(name) != self.players.get(name))
+        self.update_timeline()
+        self.schedule_redraw()
 
-            elif event_type == "PlayerTransform":
-                player = body.get("player", {})
-                name = player.get("name", "Unknown")
-                pos = player.get("position", {})
-                if name:
-                    self.player_positions[name] = {
-                        "x": round(pos.get("x", 0), 1),
-                        "y": round(pos.get("y", 0), 1),
-                        "z": round(pos.get("z", 0), 1)
-                    }
-                    self.joined_players.add(name)
+    def current_players(self):
+        return self.players if self.view is None else self.view
 
-            elif event_type == "PlayerMessage":
-                name = body.get("sender", "Unknown")
-                self.joined_players.add(name)
+    def schedule_redraw(self):
+        if self.dirty and not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after(FRAME_MS, self.refresh_display)
 
-        self.refresh_display()
+    def row_values(self, state):
+        position = state["position"] or ("", "", "")
+        last_seen = state["last_seen"][11:19] if state["last_seen"] else ""
+        dimension = "" if state["dimension"] is None else state["dimension"]
+        return ("joined" if state["joined"] else "left",) + tuple(position) + (dimension, last_seen)
+
+    def matches(self, name, state):
+        if self.name_filter and self.name_filter not in name.lower():
+            return False
+        if self.region_filter is not None:
+            if state["position"] is None:
+                return False
+            x1, z1, x2, z2 = self.region_filter
+            x, _, z = state["position"]
+            return x1 <= x <= x2 and z1 <= z <= z2
+        return True
 
     def refresh_display(self):
-        self.player_list.config(state="normal")
-        self.player_list.delete(1.0, tk.END)
-
-        self.player_list.insert(tk.END, "🧍 Joined Players:\n")
-        for name in sorted(self.joined_players):
-            self.player_list.insert(tk.END, f"  • {name}\n")
-
-        self.player_list.insert(tk.END, "\n📍 Player Positions:\n")
-        for name, pos in self.player_positions.items():
-            self.player_list.insert(
-                tk.END,
-                f"  • {name}: ({pos['x']}, {pos['y']}, {pos['z']})\n"
-            )
+        """Update only the rows of players that changed, within a per-frame time budget."""
+        self.redraw_pending = False
+        deadline = time.perf_counter() + FRAME_BUDGET
+        tree = self.player_list
+        players = self.current_players()
+        while self.dirty and time.perf_counter() < deadline:
+            name = self.dirty.pop()
+            state = players.get(name)
+            if state is None:
+                # Player not seen yet at the scrubbed time
+                if name in self.rendered:
+                    tree.delete(name)
+                    del self.rendered[name]
+                    self.detached.discard(name)
+                continue
+            values = self.row_values(state)
+            if name not in self.rendered:
+                tree.insert("", self.sorted_position(name) if self.sort_column == "#0" else tk.END,
+                            iid=name, text=name, values=values)
+            elif self.rendered[name] != values:
+                tree.item(name, values=values)
+            self.rendered[name] = values
+
+            # Hide or show the row according to the current filter
+            visible = self.matches(name, state)
+            if visible and name in self.detached:
+                self.detached.discard(name)
+                tree.move(name, "", self.sorted_position(name) if self.sort_column == "#0" else tk.END)
+            elif not visible and name not in self.detached:
+                self.detached.add(name)
+                tree.detach(name)
+
+        shown = len(players) - len(self.detached)
+        self.status.config(text=f"Monitoring: {self.selected_file.name} — {shown} of {len(players)} players",
+                           foreground="blue")
+        self.schedule_redraw()  # Leftover rows go in the next frame
+
+    def sorted_position(self, name):
+        """Index for a row when the list is sorted by name (binary search over visible rows)."""
+        children = self.player_list.get_children("")
+        lo, hi = 0, len(children)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            before = children[mid].lower() < name.lower()
+            if before != self.sort_reverse:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def sort_by(self, column):
+        """Sort visible rows by a column (click again to reverse)."""
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+
+        def key(name):
+            if column == "#0":
+                return (0, name.lower())
+            value = self.player_list.set(name, column)
+            try:
+                return (0, float(value))
+            except ValueError:
+                return (1 if value == "" else 0, value)
+
+        for index, name in enumerate(sorted(self.player_list.get_children(""), key=key, reverse=self.sort_reverse)):
+            self.player_list.move(name, "", index)
 
-        self.player_list.config(state="disabled")
+    def apply_filter(self):
+        try:
+            self.region_filter = parse_region(self.region_entry.get())
+        except ValueError:
+            self.status.config(text="Region must be four numbers: x1,z1,x2,z2", foreground="red")
+            return
+        self.name_filter = self.name_entry.get().strip().lower()
+        self.dirty.update(self.current_players())  # Every row needs re-checking against the new filter
+        self.schedule_redraw()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,142 @@
+import cProfile
+import json
+import os
+import platform
+import pstats
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_ENV = "MCWS_PROFILE"  # e.g. MCWS_PROFILE=cprofile,tracemalloc
+PROFILE_DIR = Path(__file__).resolve().parent / "data" / "profiles"
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 10
+
+
+def env_modes():
+    """Capture modes requested in MCWS_PROFILE ("cprofile", "tracemalloc", or both, comma-separated)."""
+    return {mode.strip().lower() for mode in os.getenv(PROFILE_ENV, "").split(",") if mode.strip()}
+
+
+def code_version():
+    """Git commit of the code being profiled, so runs can be compared across versions."""
+    try:
+        result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=Path(__file__).resolve().parent,
+                                capture_output=True, text=True, timeout=5)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class RunProfiler:
+    """Times the stages of one UI action ("run") and writes a JSON profile for each run.
+
+    Wrap the action in run(), and each part of it in stage(). cProfile and tracemalloc capture are
+    off unless switched on with MCWS_PROFILE or the apps' Profiling menu, since both slow the run down.
+    """
+
+    def __init__(self, app, report=None, directory=PROFILE_DIR):
+        self.app = app
+        self.report = report  # called with a one-line summary after each run
+        self.directory = Path(directory)
+        modes = env_modes()
+        self.cprofile = "cprofile" in modes
+        self.tracemalloc = "tracemalloc" in modes
+        self.version = code_version()
+        self.current = None  # the run in progress
+        self.last_summary = ""
+
+    @contextmanager
+    def run(self, name, **info):
+        if self.current is not None:
+            yield  # Nested runs are part of the outer one
+            return
+
+        profiler = cProfile.Profile() if self.cprofile else None
+        tracing = self.tracemalloc and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        self.current = {"name": name, "stages": [], "info": info}
+        started_at = datetime.now()
+        started = time.perf_counter()
+        status = "ok"
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            total = time.perf_counter() - started
+            run, self.current = self.current, None
+            allocations = None
+            if tracing:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                allocations = [
+                    {"where": str(stat.traceback), "kb": stat.size / 1024, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+                ]
+            self.finish(run, started_at, total, status, profiler, allocations)
+
+    @contextmanager
+    def stage(self, name):
+        if self.current is None:
+            yield
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {"name": name, "seconds": time.perf_counter() - started}
+            if tracemalloc.is_tracing():
+                entry["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+            self.current["stages"].append(entry)
+
+    def finish(self, run, started_at, total, status, profiler, allocations):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.app}_{run['name']}_{started_at.strftime('%Y-%m-%dT%H-%M-%S-%f')}"
+        profile = {
+            "app": self.app,
+            "run": run["name"],
+            "started": started_at.isoformat(),
+            "version": self.version,
+            "python": platform.python_version(),
+            "status": status,
+            "total_seconds": total,
+            "stages": run["stages"],
+            "info": run["info"]
+        }
+        if profiler is not None:
+            prof_path = self.directory / f"{stem}.prof"
+            profiler.dump_stats(str(prof_path))  # Open with snakeviz or python -m pstats
+            stats = pstats.Stats(profiler)
+            ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+            profile["cprofile"] = {
+                "stats_file": prof_path.name,
+                "functions": [
+                    {"function": f"{file}:{line}({func})", "calls": calls, "total_seconds": tottime,
+                     "cumulative_seconds": cumtime}
+                    for (file, line, func), (_, calls, tottime, cumtime, _) in ranked
+                ]
+            }
+        if allocations is not None:
+            profile["tracemalloc"] = allocations
+
+        path = self.directory / f"{stem}.json"
+        with open(path, "w") as f:
+            json.dump(profile, f, indent=2)
+
+        stages = ", ".join(f"{stage['name']} {stage['seconds']:.2f}s" for stage in run["stages"])
+        self.last_summary = f"{run['name']}: {stages} (total {total:.2f}s) → {path.name}"
+        if self.report is not None:
+            self.report(self.last_summary)
+        return profile
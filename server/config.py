@@ -0,0 +1,83 @@
+import copy
+import json
+import os
+from pathlib import Path
+
+from flow import DEFAULT_PRIORITIES
+
+BASE_DIR = Path(__file__).resolve().parent
+CONFIG_FILE = Path(os.getenv("MCWS_CONFIG", BASE_DIR / "config.json"))
+
+# Built-in defaults, used for anything the config file leaves out
+DEFAULT_CONFIG = {
+    "subscriptions": {
+        # Applied to every client unless overridden in "clients"
+        "default": {
+            "PlayerJoin": {},
+            "PlayerLeave": {},
+            "PlayerMessage": {},
+            "PlayerTransform": {},
+            "BlockPlaced": {},
+            "BlockBroken": {}
+        },
+        # Per client IP event sets, e.g. {"192.168.1.20": {"PlayerTransform": {"sample": 0.5}}}
+        "clients": {}
+    },
+    # Options passed to websockets.serve
+    "websocket": {
+        "max_size": 1048576,  # bytes per message
+        "max_queue": 32,  # frames buffered by the library before backpressure
+        "compression": "deflate",  # "deflate" or null to disable permessage-deflate
+        "deflate": {},  # optional: server_max_window_bits, client_max_window_bits, mem_level
+        "ping_interval": 20,
+        "ping_timeout": 20,
+        "close_timeout": 5,
+        "idle_timeout": None  # seconds of silence before closing a client; off, since Minecraft won't reconnect
+    },
+    # Per-connection receive queues
+    "flow": {
+        "queue_size": 1000,
+        "batch_size": 50,  # messages processed before yielding to other clients
+        "priorities": DEFAULT_PRIORITIES  # lower is kept longer when shedding
+    },
+    # Write-ahead journal in front of the session data file
+    "journal": {
+        "resume": False,  # continue the newest events_*.json instead of starting a new one
+        "fsync_interval": 1.0,  # seconds between journal fsyncs
+        "checkpoint_interval": 1.0,  # seconds between checkpoints; readers of the data file lag by at most this
+        "checkpoint_events": 500  # ...or sooner once this many events are pending
+    },
+    # Optional SQLite event store alongside the JSON files
+    "storage": {
+        "sqlite": False,
+        "path": None,  # defaults to data/events.db
+        "batch_size": 500  # events per insert transaction (also flushed every fsync_interval)
+    },
+    # Prometheus endpoint and console stats summary
+    "metrics": {
+        "host": "127.0.0.1",
+        "port": 9464,
+        "stats_interval": 60  # seconds between one-line stats summaries
+    }
+}
+
+
+def _merge(base, override):
+    """Overlay each config section key by key. Values inside a section are replaced, not merged,
+    so a file can narrow e.g. the default subscription set."""
+    merged = copy.deepcopy(base)
+    for section, values in override.items():
+        if isinstance(values, dict) and isinstance(merged.get(section), dict):
+            merged[section].update(values)
+        else:
+            merged[section] = values
+    return merged
+
+
+def load_config(path=CONFIG_FILE):
+    """Load the server config file on top of DEFAULT_CONFIG. A missing file means all defaults."""
+    path = Path(path)
+    if not path.exists():
+        return copy.deepcopy(DEFAULT_CONFIG)
+    with path.open("r") as f:
+        return _merge(DEFAULT_CONFIG, json.load(f))
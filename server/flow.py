@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+from collections import deque
+
+# Lower number = more important. PlayerTransform is shed first, then chat/blocks, join/leave last.
+DEFAULT_PRIORITIES = {
+    "PlayerJoin": 0,
+    "PlayerLeave": 0,
+    "PlayerMessage": 1,
+    "BlockPlaced": 1,
+    "BlockBroken": 1,
+    "PlayerTransform": 2
+}
+DEFAULT_PRIORITY = 1
+
+
+def check_priorities(priorities):
+    """Raise ValueError unless every priority is a non-negative integer (they index the queue levels)."""
+    for event_name, priority in priorities.items():
+        if not isinstance(priority, int) or isinstance(priority, bool) or priority < 0:
+            raise ValueError(f"Invalid flow priority for {event_name}: {priority!r} (expected an integer >= 0)")
+
+
+class ReceiveQueue:
+    """Bounded per-connection receive queue with priority-based shedding.
+
+    Messages come out in arrival order. When the queue is full, the oldest message of the
+    least important class that is no more important than the incoming one is dropped to make room;
+    if everything queued is more important, the incoming message is dropped instead.
+    """
+
+    def __init__(self, maxsize=1000, priorities=None):
+        self.maxsize = maxsize
+        self.priorities = dict(DEFAULT_PRIORITIES if priorities is None else priorities)
+        check_priorities(self.priorities)
+        levels = max(list(self.priorities.values()) + [DEFAULT_PRIORITY]) + 1
+        self.levels = [deque() for _ in range(levels)]
+        self.size = 0
+        self.closed = False
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return self.size
+
+    def priority_of(self, event_name):
+        return self.priorities.get(event_name, DEFAULT_PRIORITY)
+
+    def put(self, item, event_name):
+        """Queue an item. Returns the event name of whatever was shed to make room, or None."""
+        priority = self.priority_of(event_name)
+        shed = None
+        if self.size >= self.maxsize:
+            victim_level = None
+            for level in range(len(self.levels) - 1, priority - 1, -1):
+                if self.levels[level]:
+                    victim_level = level
+                    break
+            if victim_level is None:
+                return event_name  # Everything queued matters more than this message
+            _, victim_name, _ = self.levels[victim_level].popleft()
+            self.size -= 1
+            shed = victim_name
+
+        self.levels[priority].append((next(self._seq), event_name, item))
+        self.size += 1
+        self._ready.set()
+        return shed
+
+    def get_nowait(self):
+        """Pop the oldest queued item across all priority levels, or None if empty."""
+        head = None
+        for level in self.levels:
+            if level and (head is None or level[0][0] < head[0][0]):
+                head = level
+        if head is None:
+            return None
+        self.size -= 1
+        return head.popleft()[2]
+
+    async def get(self):
+        """Wait for the next item. Returns None once the queue is closed and drained."""
+        while True:
+            item = self.get_nowait()
+            if item is not None:
+                return item
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
@@ -0,0 +1,308 @@
+import json
+import os
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from timeindex import iter_records
+
+# Records are written compactly, one per line, so the data file stays a valid JSON array
+# that lab.py / monitor.py can json.load, while new records are appended in place.
+ARRAY_TAIL = b"\n]\n"
+TAIL_SCAN_BYTES = 1 << 20  # most that repairing a torn data file may cut off
+
+
+def encode_record(entry):
+    return json.dumps(entry, separators=(",", ":")).encode("utf-8")
+
+
+def latest_session(data_dir):
+    """Return the newest events_*.json in data_dir, or None."""
+    sessions = sorted(Path(data_dir).glob("events_*.json"))
+    return sessions[-1] if sessions else None
+
+
+def unrecovered_sessions(data_dir):
+    """Data files whose journal still holds events that never reached them (the server was killed)."""
+    sessions = []
+    for journal_file in sorted(Path(data_dir).glob("events_*.journal")):
+        with journal_file.open("rb") as f:
+            f.readline()  # Header
+            if f.readline().strip():
+                sessions.append(journal_file.with_suffix(".json"))
+    return sessions
+
+
+def lock(f):
+    """Take an exclusive lock on an open file without waiting; raises OSError if another process holds it.
+
+    The lock belongs to the open file, so the OS drops it when the file is closed or the process dies.
+    """
+    f.seek(0)
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def unlock(f):
+    f.seek(0)
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def is_running(data_path):
+    """True while a server holds the session open (EventJournal keeps events_X.lock locked)."""
+    try:
+        f = Path(data_path).with_suffix(".lock").open("r+b")
+    except FileNotFoundError:
+        return False
+    with f:
+        try:
+            lock(f)
+        except OSError:
+            return True
+        unlock(f)
+        return False
+
+
+def find_body_end(path):
+    """Locate where new records should be written in an existing data file that has no journal header.
+
+    Returns (body_end, has_records, records, repaired). body_end is the byte offset just after the last
+    complete record (or after the opening "["). The file is streamed once, so this works for both the
+    pretty-printed and the one-record-per-line layouts and also counts the records; it only runs for
+    files without a journal header (older sessions, or a lost journal). A file torn mid-write is cut back
+    to its last complete record. Raises ValueError, leaving the file untouched, if that would mean
+    dropping more than a torn tail.
+    """
+    size = path.stat().st_size
+    if size == 0:
+        return None, False, 0, True
+
+    body_end = None
+    records = 0
+    for _, end, _ in iter_records(path):
+        body_end = end
+        records += 1
+
+    with path.open("rb") as f:
+        if body_end is None:
+            head = f.read(TAIL_SCAN_BYTES)
+            if not head.lstrip().startswith(b"["):
+                raise ValueError(f"{path} is not a JSON array of events")
+            body_end = head.index(b"[") + 1
+        if size - body_end > TAIL_SCAN_BYTES:
+            raise ValueError(f"Cannot read {path} past byte {body_end}")
+        f.seek(body_end)
+        tail = f.read()
+
+    return body_end, records > 0, records, tail.strip() != b"]"
+
+
+class EventJournal:
+    """Write-ahead journal in front of the session data file.
+
+    Every event is appended to `<data file>.journal` as one JSON line. Checkpoints copy journaled
+    records onto the end of the data file, fsync it, then reset the journal to a single header line
+    recording where the data file body ends. Recovery truncates the data file back to that offset and
+    replays the journal, so it only touches records written since the last checkpoint.
+    """
+
+    def __init__(self, data_file, fsync_interval=1.0):
+        self.data_file = Path(data_file)
+        self.journal_file = self.data_file.with_suffix(".journal")
+        self.lock_file = self.data_file.with_suffix(".lock")  # locked while the session is open
+        self.fsync_interval = fsync_interval
+        self.pending = []  # encoded records not yet checkpointed
+        self.records = 0  # records in the data file plus pending
+        self.body_end = None
+        self.has_records = False
+        self.last_sync = time.monotonic()
+        self.dirty = False
+        self.checkpoint_listeners = []  # called with [(offset, record bytes), ...] after each checkpoint
+        self.replayed = []  # records recovered from the journal by open()
+        self.replayed_from = 0  # record number of the first of them in the data file
+        self._journal = None
+        self._lock = None
+
+    def open(self):
+        """Create or recover the data file and journal. Returns a short recovery description."""
+        # Tells archive.py and other servers the session is still being written. The lock file itself is
+        # left in place after close; only the OS lock on it counts.
+        self._lock = self.lock_file.open("a+b")
+        try:
+            lock(self._lock)
+        except OSError:
+            self._lock.close()
+            self._lock = None
+            raise RuntimeError(f"{self.data_file.name} is open in another running server") from None
+
+        try:
+            note = "new session"
+            if self.data_file.exists() and self.data_file.stat().st_size > 0:
+                note = self._recover()
+            else:
+                with self.data_file.open("wb") as f:
+                    f.write(b"[" + ARRAY_TAIL)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.body_end = 1
+                self.has_records = False
+
+            self._write_journal_header()
+        except Exception:
+            self._release_lock()
+            raise
+        return note
+
+    def _release_lock(self):
+        if self._lock is not None:
+            unlock(self._lock)
+            self._lock.close()
+            self._lock = None
+
+    def _recover(self):
+        header, journaled, torn = self._read_journal()
+        if header is not None:
+            # The header says exactly where the data file body ended at the last checkpoint
+            self.body_end = header["checkpoint"]
+            self.has_records = header.get("has_records", True)
+            self.records = header.get("records", 0)
+            repaired = torn
+        else:
+            self.body_end, self.has_records, self.records, repaired = find_body_end(self.data_file)
+            if self.body_end is None:
+                self.body_end, self.has_records = 1, False
+                with self.data_file.open("wb") as f:
+                    f.write(b"[")
+
+        # Anything past body_end was either a torn checkpoint or the tail; rewrite from the journal
+        with self.data_file.open("r+b") as f:
+            f.truncate(self.body_end)
+            f.seek(self.body_end)
+            f.write(ARRAY_TAIL)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.pending = journaled
+        self.replayed = list(journaled)
+        self.replayed_from = self.records
+        self.records += len(journaled)
+        self.checkpoint()
+
+        note = f"{self.data_file.name}: replayed {len(journaled)} journaled events"
+        if repaired:
+            note += ", repaired truncated tail"
+        return note
+
+    def _read_journal(self):
+        """Return (header, record lines, torn) from an existing journal, or (None, [], False)."""
+        if not self.journal_file.exists():
+            return None, [], False
+        with self.journal_file.open("rb") as f:
+            raw = f.read()
+
+        lines = raw.split(b"\n")
+        torn = not raw.endswith(b"\n")
+        try:
+            header = json.loads(lines[0])
+            header["checkpoint"]
+        except (ValueError, KeyError, TypeError):
+            return None, [], True
+
+        records = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            try:
+                json.loads(line)
+            except ValueError:
+                torn = True  # Partial final write; everything after it is discarded
+                break
+            records.append(line)
+        return header, records, torn
+
+    def _write_journal_header(self):
+        """Atomically replace the journal with a header describing the checkpointed data file."""
+        if self._journal is not None:
+            self._journal.close()
+        header = json.dumps({
+            "checkpoint": self.body_end,
+            "has_records": self.has_records,
+            "records": self.records - len(self.pending)
+        }).encode("utf-8")
+        tmp = self.journal_file.with_suffix(".journal.tmp")
+        with tmp.open("wb") as f:
+            f.write(header + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_file)
+        self._journal = self.journal_file.open("ab")
+
+    def append(self, entry):
+        """Journal one event. The line is flushed immediately; fsync is grouped by fsync_interval."""
+        record = encode_record(entry)
+        self._journal.write(record + b"\n")
+        self._journal.flush()
+        self.pending.append(record)
+        self.records += 1
+        self.dirty = True
+        if time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self.dirty and self._journal is not None:
+            os.fsync(self._journal.fileno())
+            self.dirty = False
+        self.last_sync = time.monotonic()
+
+    def checkpoint(self):
+        """Append pending records to the data file in place, then reset the journal."""
+        if not self.pending:
+            return 0
+
+        written = []
+        chunks = []
+        offset = self.body_end
+        for record in self.pending:
+            sep = b",\n" if (self.has_records or written) else b"\n"
+            offset += len(sep)
+            written.append((offset, record))
+            chunks.append(sep + record)
+            offset += len(record)
+
+        with self.data_file.open("r+b") as f:
+            f.seek(self.body_end)
+            f.write(b"".join(chunks) + ARRAY_TAIL)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        count = len(self.pending)
+        self.body_end = offset
+        self.has_records = True
+        self.pending = []
+        self._write_journal_header()
+        self.dirty = False
+
+        for listener in self.checkpoint_listeners:
+            listener(written)
+        return count
+
+    def close(self):
+        if self._journal is None:
+            return
+        self.checkpoint()
+        self.sync()
+        # The header-only journal is kept so a resumed session knows its record count
+        self._journal.close()
+        self._journal = None
+        self._release_lock()
@@ -5,9 +5,21 @@ import uuid
 import signal
 import sys
 import socket
+import time
 from pathlib import Path
 from datetime import datetime
 
+# Modules shared with the lab / monitor apps live at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG_FILE, load_config
+from metrics import MetricsRegistry, start_metrics_server, periodic_summary
+from subscriptions import SubscriptionPolicy, peek_event_name
+from flow import ReceiveQueue, check_priorities
+from journal import EventJournal, is_running, latest_session, unrecovered_sessions
+from timeindex import open_index
+from sqlite_store import EventStore
+
 clients = set()
 
 # Setup data file
@@ -15,11 +27,66 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
-DATA_FILE = DATA_DIR / f"events_{timestamp}.json"
-LOG_FILE = DATA_DIR / f"server_{timestamp}.log"
+config = load_config()
+
+# Resume the newest session file instead of starting a new one (config or --resume)
+def new_session_file():
+    return DATA_DIR / f"events_{datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json"
+
+RESUME = config["journal"]["resume"] or "--resume" in sys.argv
+DATA_FILE = (latest_session(DATA_DIR) if RESUME else None) or new_session_file()
+LOG_FILE = DATA_DIR / f"server_{DATA_FILE.stem[len('events_'):]}.log"
+
+# Optional SQLite store, one session per events file
+store = None
+store_session = None
+if config["storage"]["sqlite"]:
+    store = EventStore(config["storage"]["path"] or DATA_DIR / "events.db", config["storage"]["batch_size"])
+
+def use_session(data_file):
+    """Point the journal (and the SQLite store session) at data_file."""
+    global DATA_FILE, journal, store_session
+    DATA_FILE = data_file
+    journal = EventJournal(data_file, config["journal"]["fsync_interval"])
+    if store is not None:
+        store_session = store.session_id(data_file.stem)
 
-event_log = []
+use_session(DATA_FILE)
+subscription_policy = SubscriptionPolicy(config["subscriptions"])
+check_priorities(config["flow"]["priorities"])  # Fail at startup, not on the first connection
+
+# Metrics endpoint (Prometheus text format) and console summary
+metrics = MetricsRegistry()
+events_received = metrics.counter(
+    "mcws_events_received_total", "Event messages received", ("event", "client_ip"))
+messages_dropped = metrics.counter(
+    "mcws_messages_dropped_total", "Messages received but not stored", ("reason",))
+events_filtered = metrics.counter(
+    "mcws_events_filtered_total", "Events discarded by sampling or rate limits before parsing", ("event", "reason"))
+bytes_received = metrics.counter(
+    "mcws_bytes_received_total", "Raw WebSocket payload bytes received", ("client_ip",))
+write_latency = metrics.histogram(
+    "mcws_write_seconds", "Time spent persisting the event log")
+handle_latency = metrics.histogram(
+    "mcws_handle_seconds", "Time from message receipt to event stored", ("event",))
+events_shed = metrics.counter(
+    "mcws_events_shed_total", "Messages shed from full receive queues", ("event", "client_ip"))
+queue_depth = metrics.gauge(
+    "mcws_receive_queue_depth", "Messages waiting in each client's receive queue", ("client_ip",))
+connections_total = metrics.counter(
+    "mcws_connections_total", "WebSocket connections accepted")
+metrics.gauge("mcws_clients_connected", "Currently connected clients", callback=lambda: len(clients))
+metrics.gauge("mcws_events_stored", "Events stored in the session file", callback=lambda: journal.records)
+metrics.gauge("mcws_journal_pending", "Journaled events not yet checkpointed", callback=lambda: len(journal.pending))
+checkpoint_latency = metrics.histogram(
+    "mcws_checkpoint_seconds", "Time spent checkpointing the journal into the data file")
+store_latency = metrics.histogram(
+    "mcws_sqlite_flush_seconds", "Time spent committing a batch to the SQLite store")
+metrics.gauge("mcws_uptime_seconds", "Seconds since server start", callback=lambda: time.time() - metrics.started)
+if store is not None:
+    store.skip_listeners.append(lambda count: messages_dropped.inc("store_invalid", amount=count))
+
+_last_summary = {"time": time.time(), "events": 0, "per_client": {}, "write_buckets": []}
 
 # Set up logging function
 def log_message(message):
@@ -35,13 +102,111 @@ def get_local_ip():
     s.close()
     return local_ip
 
-async def save_event_log():
+def stats_summary():
+    """One-line summary of activity since the previous summary."""
+    now = time.time()
+    elapsed = max(now - _last_summary["time"], 1e-9)
+
+    total = events_received.total()
+    per_client = {}
+    for (_, ip), count in events_received.values.items():
+        per_client[ip] = per_client.get(ip, 0) + count
+
+    rate = (total - _last_summary["events"]) / elapsed
+    client_rates = sorted(
+        ((ip, (count - _last_summary["per_client"].get(ip, 0)) / elapsed) for ip, count in per_client.items()),
+        key=lambda item: item[1], reverse=True
+    )
+    top = ", ".join(f"{ip} {r:.1f}/s" for ip, r in client_rates[:3]) or "none"
+
+    # Write latency over this interval only, from the bucket counts added since the last summary
+    write_buckets = write_latency.snapshot()
+    p50 = write_latency.quantile(0.5, since=_last_summary["write_buckets"])
+    p99 = write_latency.quantile(0.99, since=_last_summary["write_buckets"])
+    write_text = f"{p50 * 1000:.1f}/{p99 * 1000:.1f}ms" if p50 is not None else "n/a"
+
+    _last_summary.update(time=now, events=total, per_client=per_client, write_buckets=write_buckets)
+    return (f"📊 {rate:.1f} events/s | total {total} | clients {len(clients)} | "
+            f"top {top} | queued {sum(queue_depth.values.values())} | write p50/p99 {write_text} | "
+            f"dropped {messages_dropped.total()} | shed {events_shed.total()}")
+
+async def save_event(event_entry):
+    try:
+        with write_latency.time():
+            journal.append(event_entry)
+    except Exception as e:
+        messages_dropped.inc("write_error")
+        log_message(f"Error saving event: {e}")
+        return
+    if store is not None:
+        try:
+            store.add(store_session, event_entry)
+        except Exception as e:
+            # The event is journaled and stays buffered in the store until a flush succeeds
+            log_message(f"Error writing events to {store.path}: {e}")
+
+def catch_up_store(recovered):
+    """Give the SQLite store the events it lost when the server was killed (journal-replayed or older)."""
+    if store is None:
+        return
+    try:
+        added = store.catch_up(recovered.data_file.stem, recovered.data_file,
+                               recovered.replayed, recovered.replayed_from)
+        if added:
+            log_message(f"🗄️  Added {added} recovered events to {store.path} (session {recovered.data_file.stem})")
+    except Exception as e:
+        log_message(f"[!!] Could not bring {store.path} up to date for {recovered.data_file.name}: {e}")
+
+def recover_previous_sessions():
+    """Replay journals left behind by a killed server, whether or not this run resumes that session."""
+    for data_file in unrecovered_sessions(DATA_DIR):
+        if data_file == DATA_FILE:
+            continue  # Recovered by journal.open()
+        if is_running(data_file):
+            log_message(f"[!!] {data_file.name} is open in another running server, not recovering it")
+            continue
+        if not data_file.exists():
+            log_message(f"[!!] {data_file.with_suffix('.journal').name} has events but {data_file.name} is missing")
+            continue
+        try:
+            previous = EventJournal(data_file, config["journal"]["fsync_interval"])
+            note = previous.open()
+            previous.close()
+            log_message(f"🗒️  Recovered {note}")
+            catch_up_store(previous)
+        except Exception as e:
+            log_message(f"[!!] Could not recover {data_file.name}: {e}")
+
+def checkpoint_journal():
+    try:
+        with checkpoint_latency.time():
+            count = journal.checkpoint()
+        if count:
+            log_message(f"Events saved to: {DATA_FILE} (+{count})")
+    except Exception as e:
+        log_message(f"Error checkpointing events: {e}")
+
+def flush_store():
+    if store is None:
+        return
     try:
-        with DATA_FILE.open("w") as f:
-            json.dump(event_log, f, indent=2)
-        log_message(f"Events saved to: {DATA_FILE}")
+        with store_latency.time():
+            store.flush()
     except Exception as e:
-        log_message(f"Error saving events: {e}")
+        log_message(f"Error writing events to {store.path}: {e}")
+
+async def journal_maintenance():
+    """Group-commit fsyncs and checkpoint the journal by time or event count."""
+    settings = config["journal"]
+    last_checkpoint = time.monotonic()
+    while True:
+        await asyncio.sleep(settings["fsync_interval"])
+        journal.sync()
+        flush_store()
+        due = time.monotonic() - last_checkpoint >= settings["checkpoint_interval"]
+        if due or len(journal.pending) >= settings["checkpoint_events"]:
+            checkpoint_journal()
+            last_checkpoint = time.monotonic()
 
 async def subscribe_event(websocket, event_name):
     await websocket.send(json.dumps({
@@ -57,48 +222,130 @@ async def subscribe_event(websocket, event_name):
     }))
     log_message(f"[{websocket.remote_address[0]}] ← Subscribed to {event_name}")
 
+async def process_message(message, client_ip, received_at, received_ts):
+    """Parse one queued message and store it if it is an event."""
+    try:
+        data = json.loads(message)
+    except json.JSONDecodeError:
+        messages_dropped.inc("invalid_json")
+        return
+
+    header = data.get("header", {})
+    body = data.get("body", {})
+    event_name = header.get("eventName", "")
+    message_type = header.get("messagePurpose", "")
+
+    # Only handle event messages
+    if message_type == "event":
+        event_entry = {
+            "event": event_name,
+            "body": body,
+            "client_ip": client_ip,
+            "timestamp": received_ts
+        }
+
+        await save_event(event_entry)
+
+        events_received.inc(event_name, client_ip)
+        handle_latency.observe(time.perf_counter() - received_at, event_name)
+
+async def consume_messages(queue, client_ip):
+    """Drain one connection's receive queue, yielding to other connections after each batch."""
+    batch_size = config["flow"]["batch_size"]
+    processed = 0
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        queue_depth.dec(client_ip)
+        try:
+            await process_message(*item)
+        except Exception as e:
+            messages_dropped.inc("processing_error")
+            log_message(f"[!!] Error processing message from {client_ip}: {e}")
+        processed += 1
+        if processed % batch_size == 0:
+            await asyncio.sleep(0)  # Let other clients' consumers run
+
 async def handler(websocket):
     client_ip = websocket.remote_address[0]
     clients.add(websocket)
+    connections_total.inc()
 
     log_message(f"[+] Connection from {client_ip}")
 
-    # Subscribe to all desired events
-    for event in ["PlayerJoin", "PlayerLeave", "PlayerMessage", "PlayerTransform", "BlockPlaced"]:
+    # Subscribe to the events configured for this client
+    event_filter = subscription_policy.for_client(client_ip)
+    for event in event_filter.events:
         await subscribe_event(websocket, event)
 
+    # Messages are received here and processed by a separate consumer task
+    flow = config["flow"]
+    queue = ReceiveQueue(flow["queue_size"], flow["priorities"])
+    consumer = asyncio.create_task(consume_messages(queue, client_ip))
+    idle_timeout = config["websocket"]["idle_timeout"]
+
     try:
-        async for message in websocket:
+        while True:
             try:
-                data = json.loads(message)
-            except json.JSONDecodeError:
-                continue
-
-            header = data.get("header", {})
-            body = data.get("body", {})
-            event_name = header.get("eventName", "")
-            message_type = header.get("messagePurpose", "")
-
-            # Only handle event messages
-            if message_type == "event":
-                event_entry = {
-                    "event": event_name,
-                    "body": body,
-                    "client_ip": client_ip,
-                    "timestamp": datetime.now().isoformat()
-                }
-
-                event_log.append(event_entry)
-                await save_event_log()
+                message = await asyncio.wait_for(websocket.recv(), idle_timeout)
+            except asyncio.TimeoutError:
+                log_message(f"[-] {client_ip} idle for {idle_timeout}s, closing")
+                await websocket.close()
+                break
+
+            received_at = time.perf_counter()
+            received_ts = datetime.now().isoformat()
+            bytes_received.inc(client_ip, amount=len(message))
+
+            # Sampling and rate limits are applied before the message is parsed
+            event_name = peek_event_name(message)
+            if event_name:
+                reason = event_filter.admit(event_name)
+                if reason:
+                    events_filtered.inc(event_name, reason)
+                    continue
+
+            shed = queue.put((message, client_ip, received_at, received_ts), event_name)
+            if shed is None:
+                queue_depth.inc(client_ip)
+            else:
+                events_shed.inc(shed, client_ip)
 
     except websockets.exceptions.ConnectionClosed as e:
         pass
     except Exception as e:
         log_message(f"[!!] Error with {client_ip}: {e}")
     finally:
+        # Finish whatever is already queued for this client
+        queue.close()
+        await consumer
         clients.remove(websocket)
         log_message(f"Connected: {len(clients)}")  # Print active client count
 
+def websocket_options():
+    """Keyword arguments for websockets.serve from the "websocket" config section."""
+    ws = config["websocket"]
+    options = {
+        "max_size": ws["max_size"],
+        "max_queue": ws["max_queue"],
+        "ping_interval": ws["ping_interval"],
+        "ping_timeout": ws["ping_timeout"],
+        "close_timeout": ws["close_timeout"],
+        "compression": ws["compression"]
+    }
+    deflate = ws.get("deflate") or {}
+    if ws["compression"] == "deflate" and deflate:
+        # Tuned permessage-deflate instead of the library defaults
+        from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+        options["compression"] = None
+        options["extensions"] = [ServerPerMessageDeflateFactory(
+            server_max_window_bits=deflate.get("server_max_window_bits", 12),
+            client_max_window_bits=deflate.get("client_max_window_bits", 12),
+            compress_settings={"memLevel": deflate.get("mem_level", 5)}
+        )]
+    return options
+
 async def main():
     # Fetch the local IP address of the server
     local_ip = get_local_ip()
@@ -106,9 +353,50 @@ async def main():
     
     log_message(f"Server starting on {server_url}")
     log_message(f"Events will be logged to: {DATA_FILE}")
+    if store is not None:
+        log_message(f"🗄️  SQLite store: {store.path} (session {DATA_FILE.stem})")
+    recover_previous_sessions()
+    try:
+        started = time.perf_counter()
+        note = journal.open()
+    except Exception as e:
+        if not RESUME:
+            log_message(f"[!!] Could not open {DATA_FILE}: {e}")
+            return
+        # Leave the unreadable session as it is for a later look and record into a fresh one
+        log_message(f"[!!] Could not resume {DATA_FILE}: {e}")
+        use_session(new_session_file())
+        log_message(f"Events will be logged to: {DATA_FILE} instead")
+        try:
+            started = time.perf_counter()
+            note = journal.open()
+        except Exception as e:
+            log_message(f"[!!] Could not open {DATA_FILE}: {e}")
+            return
+    log_message(f"🗒️  Journal: {note} ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    catch_up_store(journal)
+
+    # Keep the time index sidecar current as records are checkpointed
+    time_index = open_index(DATA_FILE)
+    def update_index(written):
+        time_index.add_encoded(written)
+        time_index.save()
+    journal.checkpoint_listeners.append(update_index)
+    log_message(f"⚙️  Config: {CONFIG_FILE if CONFIG_FILE.exists() else 'built-in defaults'}")
     
     # Start WebSocket server
-    server = await websockets.serve(handler, local_ip, 19131)
+    server = await websockets.serve(handler, local_ip, 19131, **websocket_options())
+
+    # Metrics endpoint and periodic stats line
+    settings = config["metrics"]
+    try:
+        metrics_server = await start_metrics_server(metrics, settings["host"], settings["port"])
+        log_message(f"📈 Metrics available at http://{settings['host']}:{settings['port']}/metrics")
+    except OSError as e:
+        metrics_server = None  # e.g. port already in use; keep logging events without the endpoint
+        log_message(f"[!!] Could not start metrics endpoint on {settings['host']}:{settings['port']}: {e}")
+    stats_task = asyncio.create_task(periodic_summary(settings["stats_interval"], stats_summary, log_message))
+    journal_task = asyncio.create_task(journal_maintenance())
 
     # Set up signal handling for graceful exit
     loop = asyncio.get_event_loop()
@@ -120,6 +408,10 @@ async def main():
     except asyncio.CancelledError:
         pass
     finally:
+        stats_task.cancel()
+        journal_task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
         await shutdown(server)
 
 async def shutdown(server):
@@ -127,7 +419,9 @@ async def shutdown(server):
     server.close()
     await server.wait_closed()
     log_message("Server closed gracefully.")
-    await save_event_log()  # Save the final events before exit
+    checkpoint_journal()  # Save the final events before exit
+    journal.close()
+    flush_store()
 
 if __name__ == "__main__":
     asyncio.run(main())
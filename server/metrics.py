@@ -0,0 +1,241 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+# Default latency buckets in seconds (Prometheus style, upper bounds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        # Hot path: a single dict lookup and store, no locking (asyncio is single threaded)
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def render(self):
+        lines = []
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value. Either set directly or computed from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, label_names=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self.values = {}
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) - amount
+
+    def get(self, *label_values):
+        if self.callback is not None:
+            return self.callback()
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        if self.callback is not None:
+            return [f"{self.name} {_format_value(self.callback())}"]
+        lines = []
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram. Buckets are stored non-cumulatively and summed when rendered."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def snapshot(self, *label_values):
+        """Copy of one series' bucket counts, to pass back to quantile(since=...) later."""
+        return list(self.series.get(label_values, ()))
+
+    def quantile(self, q, *label_values, since=None):
+        """Approximate quantile (upper bucket bound) for a label combination.
+
+        With `since` (an earlier snapshot()), only observations made after that snapshot count.
+        """
+        series = self.series.get(label_values)
+        if not series:
+            return None
+        if since:
+            series = [now - before for now, before in zip(series, since)]
+        count = sum(series[:-1])
+        if count == 0:
+            return None
+        target = q * count
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for label_values, series in sorted(self.series.items()):
+            running = 0
+            for bound, bucket_count in zip(bounds, series[:-1]):
+                running += bucket_count
+                labels = _format_labels(self.label_names, label_values, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {running}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.started = time.time()
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=(), callback=None):
+        return self._register(Gauge(name, help_text, label_names, callback))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def _handle_http(registry, reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the request headers
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+        parts = request_line.decode("latin-1").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path.split("?")[0] in ("/", "/metrics"):
+            status = "200 OK"
+            body = registry.render().encode()
+        else:
+            status = "404 Not Found"
+            body = b"Not Found\n"
+
+        writer.write(
+            f"HTTP/1.0 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(registry, host="127.0.0.1", port=9464):
+    """Serve the registry on http://host:port/metrics using a bare asyncio HTTP responder."""
+    return await asyncio.start_server(
+        lambda reader, writer: _handle_http(registry, reader, writer), host, port
+    )
+
+
+async def periodic_summary(interval, summarize, log):
+    """Log a one-line stats summary every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            log(summarize())
+        except Exception as e:
+            log(f"[!!] Error building stats summary: {e}")
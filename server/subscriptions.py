@@ -0,0 +1,82 @@
+import re
+import time
+
+# Cheap pre-parse lookup of the event name in a raw Minecraft message
+_EVENT_NAME_RE = re.compile(r'"eventName"\s*:\s*"([^"]*)"')
+
+
+def peek_event_name(raw):
+    """Return the eventName of a raw JSON message without parsing it, or None."""
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", errors="replace")
+    match = _EVENT_NAME_RE.search(raw)
+    return match.group(1) if match else None
+
+
+class EventRule:
+    """Per-connection admission state for one event type.
+
+    `sample` keeps that fraction of events (spread evenly, not random).
+    `rate_limit` caps admitted events per second with a token bucket of size `burst`
+    (default: one second's worth, and never less than one event).
+    """
+
+    def __init__(self, sample=1.0, rate_limit=None, burst=None):
+        self.sample = min(max(float(sample), 0.0), 1.0)
+        self.rate_limit = float(rate_limit) if rate_limit else None
+        self.burst = float(burst) if burst else max(1.0, self.rate_limit or 0.0)
+        if self.rate_limit is not None and self.burst < 1.0:
+            # A bucket that can never hold a whole token would drop every event
+            raise ValueError(f"burst must be at least 1 (got {burst})")
+        self.credit = 0.0
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+
+    def admit(self):
+        """Return None if the event should be kept, otherwise the reason it was filtered."""
+        if self.sample < 1.0:
+            self.credit += self.sample
+            if self.credit < 1.0:
+                return "sampled"
+            self.credit -= 1.0
+
+        if self.rate_limit is not None:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate_limit)
+            self.last_refill = now
+            if self.tokens < 1.0:
+                return "rate_limited"
+            self.tokens -= 1.0
+
+        return None
+
+
+class ClientFilter:
+    """Subscription set and admission rules for a single connection."""
+
+    def __init__(self, event_settings):
+        self.events = list(event_settings)
+        self.rules = {name: EventRule(**(settings or {})) for name, settings in event_settings.items()}
+
+    def admit(self, event_name):
+        rule = self.rules.get(event_name)
+        if rule is None:
+            return "unsubscribed"
+        return rule.admit()
+
+
+class SubscriptionPolicy:
+    """Builds a ClientFilter for each connection from the "subscriptions" config section."""
+
+    def __init__(self, config):
+        self.default = config.get("default", {})
+        self.clients = config.get("clients", {})
+        # Build every configured filter once so bad settings fail at startup, not on connect
+        for ip, event_settings in [("default", self.default)] + list(self.clients.items()):
+            try:
+                ClientFilter(event_settings)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid subscriptions for {ip}: {e}") from None
+
+    def for_client(self, client_ip):
+        return ClientFilter(self.clients.get(client_ip, self.default))
@@ -0,0 +1,175 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from timeindex import to_seconds
+
+CHUNK_SIZE = 16  # Minecraft chunks are 16x16 blocks in X/Z
+MAX_GAP = 10.0  # seconds; longer gaps between position updates are not counted as dwell time
+
+
+def chunk_of(x, z):
+    return math.floor(x) // CHUNK_SIZE, math.floor(z) // CHUNK_SIZE
+
+
+class ChunkStats:
+    """Everything recorded for one (dimension, chunk x, chunk z)."""
+
+    __slots__ = ("visits", "dwell", "samples", "blocks")
+
+    def __init__(self):
+        self.visits = defaultdict(int)  # player -> times they entered the chunk
+        self.dwell = defaultdict(float)  # player -> seconds spent in the chunk
+        self.samples = []  # (seconds, player, x, y, z) position updates inside the chunk
+        self.blocks = []  # (seconds, player, x, y, z, block id, event type)
+
+
+class SpatialIndex:
+    """Chunk-keyed index of player positions and block events, built incrementally from events.
+
+    Box and radius queries only visit the chunks that overlap the region, so their cost depends on
+    the activity inside the region rather than the length of the session.
+    """
+
+    def __init__(self):
+        self.chunks = defaultdict(ChunkStats)  # (dimension, cx, cz) -> ChunkStats
+        self.last_seen = {}  # player -> (chunk key, seconds)
+
+    @classmethod
+    def from_events(cls, events):
+        index = cls()
+        for event in events:
+            index.add_event(event)
+        return index
+
+    def add_event(self, event):
+        etype = event.get("event")
+        body = event.get("body", {})
+        timestamp = event.get("timestamp")
+
+        if etype == "PlayerTransform" or etype in ("BlockPlaced", "BlockBroken"):
+            player = body.get("player", {})
+            pos = player.get("position", {})
+            x, y, z = pos.get("x"), pos.get("y"), pos.get("z")
+            if None in (x, y, z) or not timestamp:
+                return
+            name = player.get("name", "Unknown")
+            dimension = player.get("dimension", 0)
+            seconds = to_seconds(timestamp)
+            if etype == "PlayerTransform":
+                self.add_position(name, dimension, x, y, z, seconds)
+            else:
+                # Block events only carry the player's position, so the block is filed under it
+                block_id = body.get("block", {}).get("id", "unknown")
+                key = (dimension,) + chunk_of(x, z)
+                self.chunks[key].blocks.append((seconds, name, x, y, z, block_id, etype))
+
+        elif etype == "PlayerLeave":
+            name = body.get("player", {}).get("name") or body.get("playerName")
+            self.last_seen.pop(name, None)
+
+    def add_position(self, name, dimension, x, y, z, seconds):
+        key = (dimension,) + chunk_of(x, z)
+        stats = self.chunks[key]
+        stats.samples.append((seconds, name, x, y, z))
+
+        previous = self.last_seen.get(name)
+        if previous is None or previous[0] != key:
+            stats.visits[name] += 1
+        if previous is not None:
+            # Time since the last update is credited to the chunk the player was in
+            gap = seconds - previous[1]
+            if 0 < gap <= MAX_GAP:
+                self.chunks[previous[0]].dwell[name] += gap
+        self.last_seen[name] = (key, seconds)
+
+    def chunk(self, dimension, cx, cz):
+        """Stats for a single chunk, or None if nothing happened there."""
+        return self.chunks.get((dimension, cx, cz))
+
+    def _chunks_overlapping(self, dimension, x1, z1, x2, z2):
+        cx1, cz1 = chunk_of(min(x1, x2), min(z1, z2))
+        cx2, cz2 = chunk_of(max(x1, x2), max(z1, z2))
+        area = (cx2 - cx1 + 1) * (cz2 - cz1 + 1)
+        if area <= len(self.chunks):
+            # Small region: probe each chunk in it
+            for cx in range(cx1, cx2 + 1):
+                for cz in range(cz1, cz2 + 1):
+                    stats = self.chunks.get((dimension, cx, cz))
+                    if stats is not None:
+                        yield stats
+        else:
+            # Huge region: cheaper to walk the chunks that actually exist
+            for (dim, cx, cz), stats in self.chunks.items():
+                if dim == dimension and cx1 <= cx <= cx2 and cz1 <= cz <= cz2:
+                    yield stats
+
+    def _query(self, dimension, bounds, inside, start=None, end=None):
+        start_s = None if start is None else to_seconds(start)
+        end_s = None if end is None else to_seconds(end)
+
+        def in_time(seconds):
+            return (start_s is None or seconds >= start_s) and (end_s is None or seconds <= end_s)
+
+        samples = []
+        blocks = []
+        for stats in self._chunks_overlapping(dimension, *bounds):
+            samples.extend(s for s in stats.samples if in_time(s[0]) and inside(s[2], s[4]))
+            blocks.extend(b for b in stats.blocks if in_time(b[0]) and inside(b[2], b[4]))
+
+        # Per-player presence inside the region, with dwell from consecutive samples that both fall inside
+        players = {}
+        samples.sort(key=lambda s: (s[1], s[0]))
+        previous = None
+        for seconds, name, _, _, _ in samples:
+            info = players.get(name)
+            if info is None:
+                info = players[name] = {"samples": 0, "first": seconds, "last": seconds, "dwell": 0.0,
+                                        "intervals": [[seconds, seconds]]}
+            info["samples"] += 1
+            info["last"] = seconds
+            if previous is not None and previous[0] == name:
+                gap = seconds - previous[1]
+                if gap <= MAX_GAP:
+                    info["dwell"] += max(gap, 0)
+                    info["intervals"][-1][1] = seconds
+                else:
+                    info["intervals"].append([seconds, seconds])  # Left and came back
+            previous = (name, seconds)
+
+        for info in players.values():
+            info["first"] = datetime.fromtimestamp(info["first"]).isoformat()
+            info["last"] = datetime.fromtimestamp(info["last"]).isoformat()
+            info["intervals"] = [
+                (datetime.fromtimestamp(a).isoformat(), datetime.fromtimestamp(b).isoformat())
+                for a, b in info["intervals"]
+            ]
+
+        blocks.sort()
+        return {
+            "players": players,
+            "blocks": [
+                {"timestamp": datetime.fromtimestamp(b[0]).isoformat(), "player": b[1],
+                 "position": {"x": b[2], "y": b[3], "z": b[4]}, "block": b[5], "event": b[6]}
+                for b in blocks
+            ]
+        }
+
+    def query_box(self, dimension, x1, z1, x2, z2, start=None, end=None):
+        """Who was inside the X/Z box (and when), and which blocks were placed in it."""
+        lo_x, hi_x = min(x1, x2), max(x1, x2)
+        lo_z, hi_z = min(z1, z2), max(z1, z2)
+        return self._query(dimension, (lo_x, lo_z, hi_x, hi_z),
+                           lambda x, z: lo_x <= x <= hi_x and lo_z <= z <= hi_z, start, end)
+
+    def query_radius(self, dimension, x, z, radius, start=None, end=None):
+        """Like query_box, for a circle around (x, z)."""
+        r2 = radius * radius
+        return self._query(dimension, (x - radius, z - radius, x + radius, z + radius),
+                           lambda px, pz: (px - x) ** 2 + (pz - z) ** 2 <= r2, start, end)
+
+    def query_chunk(self, dimension, cx, cz, start=None, end=None):
+        """query_box over exactly one chunk."""
+        x1, z1 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+        return self.query_box(dimension, x1, z1, x1 + CHUNK_SIZE - 1e-9, z1 + CHUNK_SIZE - 1e-9, start, end)
+
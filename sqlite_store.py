@@ -0,0 +1,314 @@
+import argparse
+import json
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+from timeindex import to_seconds, iter_records
+
+SessionBounds = namedtuple("SessionBounds", ["first", "last"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    event TEXT NOT NULL,
+    player TEXT,
+    client_ip TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session_ts ON events(session_id, ts);
+CREATE INDEX IF NOT EXISTS events_player_ts ON events(player, ts);
+CREATE INDEX IF NOT EXISTS events_event_ts ON events(event, ts);
+
+CREATE TABLE IF NOT EXISTS transforms (
+    event_id INTEGER PRIMARY KEY REFERENCES events(id),
+    session_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    player TEXT NOT NULL,
+    dimension INTEGER,
+    x REAL, y REAL, z REAL,
+    y_rot REAL
+);
+CREATE INDEX IF NOT EXISTS transforms_player_ts ON transforms(player, ts);
+CREATE INDEX IF NOT EXISTS transforms_session_ts ON transforms(session_id, ts);
+
+CREATE TABLE IF NOT EXISTS messages (
+    event_id INTEGER PRIMARY KEY REFERENCES events(id),
+    session_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    sender TEXT,
+    receiver TEXT,
+    type TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_sender_ts ON messages(sender, ts);
+CREATE INDEX IF NOT EXISTS messages_session_ts ON messages(session_id, ts);
+
+CREATE TABLE IF NOT EXISTS blocks (
+    event_id INTEGER PRIMARY KEY REFERENCES events(id),
+    session_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    player TEXT,
+    action TEXT NOT NULL,
+    block_id TEXT,
+    dimension INTEGER,
+    x REAL, y REAL, z REAL
+);
+CREATE INDEX IF NOT EXISTS blocks_player_ts ON blocks(player, ts);
+CREATE INDEX IF NOT EXISTS blocks_session_ts ON blocks(session_id, ts);
+CREATE INDEX IF NOT EXISTS blocks_block_id ON blocks(block_id);
+
+CREATE TABLE IF NOT EXISTS presence (
+    event_id INTEGER PRIMARY KEY REFERENCES events(id),
+    session_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    player TEXT,
+    action TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS presence_player_ts ON presence(player, ts);
+CREATE INDEX IF NOT EXISTS presence_session_ts ON presence(session_id, ts);
+"""
+
+
+def event_player(event_name, body):
+    """The player an event is about, wherever that event type keeps the name."""
+    if event_name == "PlayerMessage":
+        return body.get("sender")
+    player = body.get("player")
+    if isinstance(player, dict):
+        return player.get("name")
+    return body.get("playerName") or player
+
+
+def normalizable(name, body, player):
+    """Whether an event has the fields its per-type table needs, each of the right shape."""
+    if not isinstance(body, dict):
+        return False
+    if name in ("PlayerTransform", "BlockPlaced", "BlockBroken"):
+        info = body.get("player", {})
+        if not isinstance(info, dict) or not isinstance(info.get("position", {}), dict):
+            return False
+        if name == "PlayerTransform":
+            return player is not None  # transforms.player is NOT NULL
+        return isinstance(body.get("block", {}), dict)
+    return True
+
+
+class EventStore:
+    """SQLite storage for events: a raw events table plus normalized, indexed per-type tables.
+
+    Writers buffer rows with add() and commit them in one transaction per flush(). The database runs
+    in WAL mode, so the lab and assessment apps can query it while the server is writing.
+    """
+
+    def __init__(self, path, batch_size=500):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.pending = []  # (session_id, event dict)
+        self.skipped = 0  # events malformed or left out of a failed batch (see flush)
+        self.skip_listeners = []  # called with the number skipped by each flush
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # --- Writing ---
+
+    def session_id(self, name):
+        row = self.conn.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+        with self.conn:
+            return self.conn.execute("INSERT INTO sessions (name) VALUES (?)", (name,)).lastrowid
+
+    def add(self, session_id, event):
+        self.pending.append((session_id, event))
+        # Every batch_size events; after a failed flush the next try waits for another full batch
+        if len(self.pending) % self.batch_size == 0:
+            self.flush()
+
+    def flush(self):
+        """Insert all buffered events in a single transaction. Returns the number written.
+
+        Events stay buffered until the transaction commits, so a flush that fails with an OperationalError
+        (e.g. the database is locked) is retried by the next one. Malformed events are skipped: without a
+        usable timestamp or event name nothing is stored, otherwise only the per-type row is left out. Any
+        other error would fail the same way every time, so that batch is dropped rather than retried.
+        """
+        if not self.pending:
+            return 0
+        pending = self.pending
+        transforms, messages, blocks, presence = [], [], [], []
+        written = skipped = 0
+
+        try:
+            with self.conn:
+                cursor = self.conn.cursor()
+                for session_id, event in pending:
+                    name = event.get("event")
+                    body = event.get("body", {})
+                    timestamp = event.get("timestamp")
+                    try:
+                        ts = to_seconds(timestamp)
+                    except (TypeError, ValueError):
+                        ts = None
+                    if ts is None or not isinstance(name, str):
+                        skipped += 1
+                        continue
+                    player = event_player(name, body) if isinstance(body, dict) else None
+                    if not isinstance(player, str):
+                        player = None
+                    cursor.execute(
+                        "INSERT INTO events (session_id, ts, timestamp, event, player, client_ip, body) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (session_id, ts, str(timestamp), name, player, event.get("client_ip"),
+                         json.dumps(body, separators=(",", ":")))
+                    )
+                    event_id = cursor.lastrowid
+                    written += 1
+                    if not normalizable(name, body, player):
+                        skipped += 1
+                        continue
+
+                    if name == "PlayerTransform" or name in ("BlockPlaced", "BlockBroken"):
+                        info = body.get("player", {})
+                        pos = info.get("position", {})
+                        location = (info.get("dimension"), pos.get("x"), pos.get("y"), pos.get("z"))
+                        if name == "PlayerTransform":
+                            transforms.append((event_id, session_id, ts, player) + location + (info.get("yRot"),))
+                        else:
+                            action = "placed" if name == "BlockPlaced" else "broken"
+                            block_id = body.get("block", {}).get("id")
+                            blocks.append((event_id, session_id, ts, player, action, block_id) + location)
+                    elif name == "PlayerMessage":
+                        messages.append((event_id, session_id, ts, body.get("sender"), body.get("receiver"),
+                                         body.get("type"), body.get("message")))
+                    elif name in ("PlayerJoin", "PlayerLeave"):
+                        presence.append((event_id, session_id, ts, player, "join" if name == "PlayerJoin" else "leave"))
+
+                cursor.executemany("INSERT INTO transforms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", transforms)
+                cursor.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", messages)
+                cursor.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", blocks)
+                cursor.executemany("INSERT INTO presence VALUES (?, ?, ?, ?, ?)", presence)
+        except sqlite3.OperationalError:
+            raise
+        except Exception:
+            self.pending = []
+            self._skip(len(pending))
+            raise
+        self.pending = []
+        self._skip(skipped)
+        return written
+
+    def _skip(self, count):
+        if count:
+            self.skipped += count
+            for listener in self.skip_listeners:
+                listener(count)
+
+    def catch_up(self, name, data_path, recent=(), recent_start=0):
+        """Add the events of a session file that the store is missing, e.g. after the server was killed.
+
+        A session's rows are stored in file order, so only records past the stored row count are added.
+        `recent` are encoded records (usually the journal just replayed) starting at record number
+        `recent_start` of the file; when they cover the gap no file scan is needed. Returns rows added.
+        """
+        row = self.conn.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return 0  # Session was never written to the store
+        session_id = row[0]
+        self.flush()
+        stored = self.conn.execute("SELECT COUNT(*) FROM events WHERE session_id = ?", (session_id,)).fetchone()[0]
+        if stored >= recent_start:
+            missing = (json.loads(record) for record in recent[stored - recent_start:])
+        else:
+            missing = (event for i, (_, _, event) in enumerate(iter_records(data_path)) if i >= stored)
+
+        added = 0
+        for event in missing:
+            if event.get("timestamp"):
+                self.add(session_id, event)
+                added += 1
+        self.flush()
+        return added
+
+    def import_file(self, data_path):
+        """Load a JSON event file as a session named after the file. Returns the number of events."""
+        data_path = Path(data_path)
+        session_id = self.session_id(data_path.stem)
+        if self.conn.execute("SELECT 1 FROM events WHERE session_id = ? LIMIT 1", (session_id,)).fetchone():
+            return 0  # Already imported
+        count = 0
+        for _, _, event in iter_records(data_path):
+            if event.get("timestamp"):
+                self.add(session_id, event)
+                count += 1
+        self.flush()
+        return count
+
+    # --- Querying ---
+
+    def sessions(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM sessions ORDER BY name")]
+
+    def session_bounds(self, session):
+        row = self.conn.execute(
+            "SELECT MIN(e.timestamp), MAX(e.timestamp) FROM events e "
+            "JOIN sessions s ON s.id = e.session_id WHERE s.name = ?", (session,)
+        ).fetchone()
+        return SessionBounds(*row) if row else SessionBounds(None, None)
+
+    def players(self, session, start=None, end=None):
+        sql, params = self._where("SELECT DISTINCT e.player FROM events e", session, start, end)
+        return sorted(row[0] for row in self.conn.execute(sql + " AND e.player IS NOT NULL", params))
+
+    def events(self, session, start=None, end=None, player=None, event_types=None):
+        """Events in the lab's JSON shape, filtered in SQL by session, time, player and type."""
+        sql, params = self._where(
+            "SELECT e.event, e.body, e.client_ip, e.timestamp FROM events e", session, start, end)
+        if player is not None:
+            sql += " AND e.player = ?"
+            params.append(player)
+        if event_types:
+            sql += f" AND e.event IN ({','.join('?' * len(event_types))})"
+            params.extend(event_types)
+        sql += " ORDER BY e.ts, e.id"
+        return [
+            {"event": name, "body": json.loads(body), "client_ip": client_ip, "timestamp": timestamp}
+            for name, body, client_ip, timestamp in self.conn.execute(sql, params)
+        ]
+
+    def _where(self, select, session, start, end):
+        sql = select + " JOIN sessions s ON s.id = e.session_id WHERE s.name = ?"
+        params = [session]
+        if start is not None:
+            sql += " AND e.ts >= ?"
+            params.append(to_seconds(start))
+        if end is not None:
+            sql += " AND e.ts <= ?"
+            params.append(to_seconds(end))
+        return sql, params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import event JSON files into the SQLite event store.")
+    parser.add_argument("files", nargs="+", help="events_*.json files to import")
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parent / "data" / "events.db"),
+                        help="database path (default: data/events.db)")
+    args = parser.parse_args()
+
+    store = EventStore(args.db)
+    for file in args.files:
+        print(f"{file}: {store.import_file(file)} events imported")
+    store.close()
@@ -0,0 +1,67 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "server"))
+
+from journal import EventJournal, is_running
+
+
+def make_events(count):
+    return [
+        {"event": "PlayerTransform", "timestamp": f"2024-01-01T00:00:{i % 60:02d}.{i:06d}",
+         "body": {"player": {"name": "Steve", "position": {"x": i, "y": 64, "z": -i}}, "note": "x" * 200}}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [20, 8000])  # 8000 records is past the old 1 MB tail scan
+def test_resume_torn_pretty_printed_file_keeps_records(tmp_path, count):
+    data_file = tmp_path / "events_2024-01-01T00-00-00.json"
+    events = make_events(count)
+    data = json.dumps(events, indent=2).encode("utf-8")
+    data_file.write_bytes(data[:len(data) // 2])  # Killed mid-write, no journal
+
+    journal = EventJournal(data_file)
+    note = journal.open()
+    journal.close()
+
+    recovered = json.loads(data_file.read_bytes())
+    assert "repaired truncated tail" in note
+    assert count // 2 - 2 <= len(recovered) < count
+    assert recovered == events[:len(recovered)]
+    assert journal.records == len(recovered)
+
+    # Resuming again appends after the surviving records
+    journal = EventJournal(data_file)
+    journal.open()
+    journal.append(events[-1])
+    journal.close()
+    assert json.loads(data_file.read_bytes()) == events[:len(recovered)] + [events[-1]]
+    assert journal.records == len(recovered) + 1
+
+
+def test_unreadable_file_is_left_untouched(tmp_path):
+    data_file = tmp_path / "events_2024-01-01T00-00-00.json"
+    data_file.write_bytes(b"not an event file")
+
+    with pytest.raises(ValueError):
+        EventJournal(data_file).open()
+    assert data_file.read_bytes() == b"not an event file"
+
+
+def test_lock_is_held_while_open_and_released_on_close(tmp_path):
+    data_file = tmp_path / "events_2024-01-01T00-00-00.json"
+    journal = EventJournal(data_file)
+    journal.open()
+    assert is_running(data_file)
+    with pytest.raises(RuntimeError):
+        EventJournal(data_file).open()
+
+    journal.close()
+    assert data_file.with_suffix(".lock").exists()  # Left behind, but no longer locked
+    assert not is_running(data_file)
@@ -0,0 +1,258 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+INDEX_VERSION = 1
+DEFAULT_BUCKET_SECONDS = 60
+CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+_TIMESTAMP_RE = re.compile(rb'"timestamp"\s*:\s*"([^"]+)"')
+
+# Presets offered by the lab / assessment time-window selectors
+WINDOW_PRESETS = {
+    "Whole session": None,
+    "Last 10 minutes": timedelta(minutes=10),
+    "Last 30 minutes": timedelta(minutes=30),
+    "Last hour": timedelta(hours=1),
+    "Custom": None
+}
+
+
+def sidecar_path(data_path):
+    """events_X.json -> events_X.idx"""
+    return Path(data_path).with_suffix(".idx")
+
+
+def to_seconds(ts):
+    """Seconds since the epoch for an ISO timestamp string or datetime (naive = local time)."""
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return ts.timestamp()
+
+
+def iter_records(path, offset=0):
+    """Stream records from a JSON array event file without loading it all.
+
+    Yields (start_offset, end_offset, record) with byte offsets into the file. Works for both the
+    pretty-printed and the one-record-per-line layouts, and stops quietly at a torn final record.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        buffer = f.read(CHUNK_SIZE)
+        eof = len(buffer) < CHUNK_SIZE
+        # Event files are written with ensure_ascii, so latin-1 keeps char and byte offsets equal
+        text = buffer.decode("latin-1")
+        base = offset  # file offset of buffer[0]
+        pos = 0
+        if offset == 0:
+            pos = text.find("[") + 1
+            if pos == 0:
+                return
+
+        while True:
+            # Skip separators between records
+            while pos < len(text) and text[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(text) and text[pos] == "]":
+                return
+
+            try:
+                if pos >= len(text):
+                    raise json.JSONDecodeError("need more data", text, pos)
+                record, end = _decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    return  # End of file or torn tail
+                more = f.read(CHUNK_SIZE)
+                eof = len(more) < CHUNK_SIZE
+                buffer, base, pos = buffer[pos:] + more, base + pos, 0
+                text = buffer.decode("latin-1")
+                continue
+
+            if not text[pos:end].isascii():
+                record = json.loads(buffer[pos:end])  # Re-decode as UTF-8
+            yield base + pos, base + end, record
+            pos = end
+
+
+class TimeIndex:
+    """Sidecar index mapping timestamp buckets to byte ranges of an event file.
+
+    Each bucket stores the lowest start offset and highest end offset of any record whose timestamp
+    falls in it, so slightly out-of-order records (e.g. from different client queues) are still found.
+    """
+
+    def __init__(self, data_path, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+        self.data_path = Path(data_path)
+        self.bucket_seconds = bucket_seconds
+        self.buckets = {}  # bucket start (epoch seconds) -> [min start offset, max end offset, count]
+        self.scanned_to = 0  # file offset just after the last indexed record
+        self.records = 0
+        self.first = None
+        self.last = None
+
+    def add(self, timestamp, start, end):
+        seconds = to_seconds(timestamp)
+        key = int(seconds // self.bucket_seconds) * self.bucket_seconds
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [start, end, 1]
+        else:
+            bucket[0] = min(bucket[0], start)
+            bucket[1] = max(bucket[1], end)
+            bucket[2] += 1
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+        self.records += 1
+        self.scanned_to = max(self.scanned_to, end)
+
+    def add_encoded(self, written):
+        """Index freshly written records given as [(start offset, record bytes), ...].
+
+        The timestamp is pulled out with a regex, so the server never re-parses what it just wrote.
+        """
+        for start, record in written:
+            match = _TIMESTAMP_RE.search(record, record.rfind(b'"timestamp"'))
+            if match:
+                self.add(match.group(1).decode("ascii"), start, start + len(record))
+
+    def extend(self):
+        """Index any records appended to the data file since the last scan."""
+        for start, end, record in iter_records(self.data_path, self.scanned_to):
+            timestamp = record.get("timestamp") if isinstance(record, dict) else None
+            if timestamp:
+                self.add(timestamp, start, end)
+            else:
+                self.scanned_to = end
+
+    def span(self, start=None, end=None):
+        """Byte range (lo, hi) covering every record in [start, end], or None if nothing matches."""
+        lo_key = None if start is None else to_seconds(start) // self.bucket_seconds * self.bucket_seconds
+        hi_key = None if end is None else to_seconds(end)
+        lo = hi = None
+        for key, (first_offset, last_end, _) in self.buckets.items():
+            if lo_key is not None and key < lo_key:
+                continue
+            if hi_key is not None and key > hi_key:
+                continue
+            lo = first_offset if lo is None else min(lo, first_offset)
+            hi = last_end if hi is None else max(hi, last_end)
+        return None if lo is None else (lo, hi)
+
+    def save(self, path=None):
+        path = Path(path) if path else sidecar_path(self.data_path)
+        data = {
+            "version": INDEX_VERSION,
+            "bucket_seconds": self.bucket_seconds,
+            "scanned_to": self.scanned_to,
+            "records": self.records,
+            "first": self.first,
+            "last": self.last,
+            "buckets": [[key] + value for key, value in sorted(self.buckets.items())]
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, data_path, path=None):
+        path = Path(path) if path else sidecar_path(data_path)
+        with path.open("r") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version in {path}")
+        index = cls(data_path, data["bucket_seconds"])
+        index.scanned_to = data["scanned_to"]
+        index.records = data["records"]
+        index.first = data["first"]
+        index.last = data["last"]
+        index.buckets = {row[0]: row[1:] for row in data["buckets"]}
+        return index
+
+
+def open_index(data_path, bucket_seconds=DEFAULT_BUCKET_SECONDS, save=True):
+    """Load the sidecar index for an event file, building or extending it as needed."""
+    data_path = Path(data_path)
+    index = None
+    try:
+        index = TimeIndex.load(data_path)
+        if index.scanned_to > data_path.stat().st_size:
+            index = None  # File was truncated or replaced; start over
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is None:
+        index = TimeIndex(data_path, bucket_seconds)
+    before = (index.scanned_to, index.records)
+    index.extend()
+    if save and (index.scanned_to, index.records) != before:
+        try:
+            index.save()
+        except OSError:
+            pass  # Read-only location; the in-memory index is still usable
+    return index
+
+
+def read_range(data_path, start=None, end=None, index=None):
+    """Return the events with start <= timestamp <= end, reading only the indexed slice of the file."""
+    if index is None:
+        index = open_index(data_path)
+    span = index.span(start, end)
+    if span is None:
+        return []
+    lo, hi = span
+    start_s = None if start is None else to_seconds(start)
+    end_s = None if end is None else to_seconds(end)
+
+    events = []
+    for offset, _, record in iter_records(data_path, lo):
+        if offset >= hi:
+            break
+        timestamp = record.get("timestamp")
+        if not timestamp:
+            continue
+        seconds = to_seconds(timestamp)
+        if (start_s is None or seconds >= start_s) and (end_s is None or seconds <= end_s):
+            events.append(record)
+    return events
+
+
+def load_events(data_path, start=None, end=None):
+    """Load a whole session with json.load, or just a time window through the index."""
+    if start is None and end is None:
+        with open(data_path, "r") as f:
+            return json.load(f)
+    return read_range(data_path, start, end)
+
+
+def parse_time(text, reference):
+    """Parse "HH:MM[:SS]" (on the reference timestamp's date) or a full ISO timestamp. Blank -> None."""
+    text = text.strip()
+    if not text:
+        return None
+    if "T" in text or "-" in text:
+        return datetime.fromisoformat(text)
+    day = datetime.fromisoformat(reference).date()
+    parts = [int(p) for p in text.split(":")]
+    while len(parts) < 3:
+        parts.append(0)
+    return datetime(day.year, day.month, day.day, *parts)
+
+
+def resolve_window(preset, from_text, to_text, index):
+    """Turn a time-window selector state into (start, end) datetimes; None means unbounded.
+
+    `index` is anything with ISO `first` / `last` timestamps (a TimeIndex or the SQLite SessionBounds).
+    """
+    if index.last is None or preset == "Whole session":
+        return None, None
+    if preset == "Custom":
+        return parse_time(from_text, index.first), parse_time(to_text, index.first)
+    last = datetime.fromisoformat(index.last)
+    return last - WINDOW_PRESETS[preset], None